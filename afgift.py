@@ -0,0 +1,89 @@
+"""Elafgift (electricity tax) schedule with date-precise validity periods.
+
+`afgift_manual.csv` lists periods as `valid_from,valid_to,afgift_dkk_per_kwh`
+(local dates, `valid_to` exclusive, an empty bound is open-ended), so a rate
+change can take effect on any day, e.g. the 2026 reduction. The older
+`year_start,year_end` format (whole years, inclusive) is still accepted.
+The rules are folded into sorted breakpoints once per file version and hourly
+rates are resolved with one `searchsorted`. Where periods overlap, later rows
+win; hours outside every period get 0.
+"""
+import numpy as np
+import pandas as pd
+
+from file_cache import FileCache
+from hour_keys import LOCAL_TZ
+
+AFGIFT_CSV = 'afgift_manual.csv'
+
+# Used when the CSV is missing or malformed
+DEFAULT_RULES = pd.DataFrame({
+    'valid_from': [None, '2026-01-01'],
+    'valid_to': ['2026-01-01', None],
+    'afgift_dkk_per_kwh': [0.9, 0.01],
+})
+
+_MIN = np.iinfo(np.int64).min
+_MAX = np.iinfo(np.int64).max
+
+def _bound(value, open_value: int) -> int:
+    if value is None or pd.isna(value) or str(value).strip() == '':
+        return open_value
+    return int(pd.Timestamp(value).tz_localize(LOCAL_TZ).as_unit('ns').value)
+
+
+def _year_bound(year: int, open_value: int) -> int:
+    if year <= 1 or year >= 9999:
+        return open_value
+    return _bound(f'{year:04d}-01-01', open_value)
+
+
+class AfgiftSchedule:
+    """Piecewise-constant afgift: `values[i]` applies from `breaks[i]` up to `breaks[i + 1]`."""
+
+    def __init__(self, breaks: np.ndarray, rates: np.ndarray):
+        # breaks: sorted int64 UTC epoch nanoseconds
+        self.breaks = breaks
+        self.values = rates
+
+    @classmethod
+    def from_rules(cls, rules: pd.DataFrame) -> 'AfgiftSchedule':
+        if 'valid_from' in rules.columns:
+            starts = [_bound(v, _MIN) for v in rules['valid_from']]
+            ends = [_bound(v, _MAX) for v in rules.get('valid_to', pd.Series(None, index=rules.index))]
+        else:
+            starts = [_year_bound(int(y), _MIN) for y in rules['year_start']]
+            ends = [_year_bound(int(y) + 1, _MAX) for y in rules['year_end']]
+        values = rules['afgift_dkk_per_kwh'].astype(float).to_numpy()
+
+        breaks = np.unique(np.array(starts + ends + [_MIN], dtype=np.int64))
+        rates = np.zeros(len(breaks), dtype=np.float64)
+        for start, end, value in zip(starts, ends, values):
+            i0, i1 = np.searchsorted(breaks, [start, end])
+            rates[i0:i1] = value
+        return cls(breaks, rates)
+
+    def rates(self, index: pd.DatetimeIndex) -> np.ndarray:
+        """Afgift in DKK/kWh for each timestamp (naive timestamps are local time)."""
+        index = pd.DatetimeIndex(index)
+        if index.tz is None:
+            index = index.tz_localize(LOCAL_TZ, ambiguous='infer', nonexistent='shift_forward')
+        segment = np.searchsorted(self.breaks, index.as_unit('ns').asi8, side='right') - 1
+        return self.values[segment]
+
+
+_schedules = FileCache(lambda path: AfgiftSchedule.from_rules(pd.read_csv(path)),
+                       fallback=lambda: AfgiftSchedule.from_rules(DEFAULT_RULES))
+
+
+def load_afgift_schedule(path: str = AFGIFT_CSV) -> AfgiftSchedule:
+    """Return the schedule for `path`, rebuilt only when the file changes.
+
+    Falls back to `DEFAULT_RULES` if the file is missing or malformed.
+    """
+    return _schedules.get(path)
+
+
+def afgift_schedule_version(path: str = AFGIFT_CSV):
+    """Version of the afgift CSV (see `FileCache.version`), for keying results built from it."""
+    return _schedules.version(path)
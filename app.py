@@ -1,48 +1,13 @@
 import streamlit as st
 import pandas as pd
 import requests
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 import plotly.graph_objects as go
-from fetch_power_data import fetch_power_data
-
-
-def _filter_df_by_view_range(df, view_range):
-    """Safely filter `df` by a Streamlit `date_input` value which may be a single
-    date, a tuple of (from, to), or contain None while the user is selecting.
-    Returns an unmodified df if parsing fails.
-    """
-    try:
-        if isinstance(view_range, tuple) and len(view_range) == 2:
-            vf_from, vf_to = view_range
-        else:
-            vf_from = view_range
-            vf_to = view_range
-
-        # If both are None, return full df
-        if vf_from is None and vf_to is None:
-            return df
-
-        # Normalize to date objects when possible
-        if vf_from is not None and not isinstance(vf_from, date):
-            vf_from = pd.to_datetime(vf_from).date()
-        if vf_to is not None and not isinstance(vf_to, date):
-            vf_to = pd.to_datetime(vf_to).date()
-
-        # Fill open-ended ranges with data bounds
-        if vf_from is None:
-            vf_from = df['time'].dt.date.min()
-        if vf_to is None:
-            vf_to = df['time'].dt.date.max()
-
-        # Ensure ordering
-        if vf_from > vf_to:
-            vf_from, vf_to = vf_to, vf_from
-
-        return df[(df['time'].dt.date >= vf_from) & (df['time'].dt.date <= vf_to)].copy()
-    except Exception:
-        return df
+import detectors
+import eloverblik
+import pipeline
 
 # Reduce top space above title and vertically center the button using custom CSS
 st.markdown(
@@ -105,6 +70,12 @@ with col_charge:
         step=0.1,
         help='Indsæt Kwh hvor du er sikker på at din elbil lader den time, fx 5 kwh hvis du ved at resten af huset max kan bruge 4,5 kwh'
     )
+    detector = st.selectbox(
+        'Metode til at finde opladning',
+        options=list(detectors.LABELS),
+        format_func=detectors.LABELS.get,
+        help='Fast grænse: timer over grænsen regnes som opladning. Grænse minus husets normale forbrug: huset beholder sit normale forbrug for tidspunktet, og kun resten regnes som opladning. Opladningssessioner: som forrige, men timen før og efter en opladning tælles også med, når forbruget er tydeligt over husets normale forbrug.'
+    )
 with col_max:
     car_max_kwh = st.number_input(
         'Max opladningshastighed (kW)',
@@ -130,14 +101,24 @@ if fetch_btn:
     if not token:
         st.error('Please enter a token')
     else:
-        df = fetch_power_data(token, charge_threshold, car_max_kwh, from_date, to_date)
-        if df is not None and not df.empty:
-            st.session_state['df_data'] = df
-            st.session_state['last_token'] = token
-            st.session_state['udeladning_pris'] = udeladning_pris
-            st.success('✅ Data hentet og gemt til denne session. Dyk ned i dit elforbrug ved at vælge en af siderne nedenfor.')
+        try:
+            df_raw = pipeline.fetch_raw(pipeline.get_pipeline(), token, from_date, to_date)
+        except eloverblik.RefreshTokenRejected:
+            st.warning('Din token blev afvist af Eloverblik. Tjek at den er kopieret korrekt og ikke er udløbet, eller opret en ny.')
         else:
-            st.warning('Beklager, der er en fejl i data indhentning')
+            if df_raw is not None and not df_raw.empty:
+                st.session_state['df_raw'] = df_raw
+                st.session_state['last_token'] = token
+                st.success('✅ Data hentet og gemt til denne session. Dyk ned i dit elforbrug ved at vælge en af siderne nedenfor.')
+            else:
+                st.warning('Beklager, der er en fejl i data indhentning')
+
+# Run car detection and costs through the session pipeline on every rerun: only the
+# nodes downstream of a changed setting are recomputed and nothing is refetched
+if st.session_state.get('df_raw') is not None:
+    st.session_state['df_key'], st.session_state['df_data'], st.session_state['cost_totals'] = pipeline.dataset(
+        pipeline.get_pipeline(), st.session_state['df_raw'], charge_threshold, car_max_kwh, detector)
+    st.session_state['udeladning_pris'] = udeladning_pris
 
 
 # Persist fetched data across reruns so date filters don't force refetch
@@ -0,0 +1,56 @@
+"""Charging sessions: runs of consecutive hours with car charging, one row each.
+
+Built in one pass over the hourly dataset: hours with `car_kwh > 0` are run-length
+encoded on their hour keys (a gap of a missing or non-charging hour ends a
+session; rows of several metering points for the same hour stay in one) and every per-session sum is one `np.add.reduceat` over the run
+starts. The cost of a session is its car kWh at spot + tarif + afgift with
+missing prices as 0, the same as `car_charge_cost` in the rollups.
+"""
+import numpy as np
+import pandas as pd
+
+from data_views import column
+from hour_keys import LOCAL_TZ, SECONDS_PER_HOUR, hour_keys
+
+SESSION_COLUMNS = ['start', 'end', 'hours', 'kwh', 'cost', 'avg_spot', 'avg_price']
+
+
+def _values(df, name) -> np.ndarray:
+    """Column `name` as floats with missing values (and a missing column) as 0."""
+    return np.nan_to_num(column(df, name).to_numpy(dtype=np.float64), nan=0.0)
+
+
+def session_table(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per charging session of the hourly `df`, oldest first.
+
+    Columns: start, end (end of the last hour), hours, kwh (car kWh), cost
+    (DKK), avg_spot and avg_price (kWh-weighted spot and total price in
+    DKK/kWh).
+    """
+    car_kwh = _values(df, 'car_kwh')
+    charging = np.flatnonzero(car_kwh > 0)
+    if len(charging) == 0:
+        empty = pd.DataFrame({c: pd.Series(dtype=float) for c in SESSION_COLUMNS})
+        return empty.astype({'start': f'datetime64[ns, {LOCAL_TZ}]', 'end': f'datetime64[ns, {LOCAL_TZ}]', 'hours': 'int64'})
+
+    keys = hour_keys(df['time'])[charging]
+    starts = np.flatnonzero(np.r_[True, np.diff(keys) > 1])
+    ends = np.r_[starts[1:], len(charging)] - 1
+
+    kwh = car_kwh[charging]
+    spot = _values(df, 'spot_pris')[charging]
+    rate = spot + _values(df, 'tarif_pris')[charging] + _values(df, 'afgift_pris')[charging]
+    session_kwh = np.add.reduceat(kwh, starts)
+    cost = np.add.reduceat(kwh * rate, starts)
+    spot_cost = np.add.reduceat(kwh * spot, starts)
+
+    times = df['time'].iloc[charging].reset_index(drop=True)
+    return pd.DataFrame({
+        'start': times.iloc[starts].reset_index(drop=True),
+        'end': times.iloc[ends].reset_index(drop=True) + pd.Timedelta(seconds=SECONDS_PER_HOUR),
+        'hours': keys[ends] - keys[starts] + 1,
+        'kwh': session_kwh,
+        'cost': cost,
+        'avg_spot': spot_cost / session_kwh,
+        'avg_price': cost / session_kwh,
+    })
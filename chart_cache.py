@@ -0,0 +1,95 @@
+"""Memoized Plotly figures and downsampling of hourly traces.
+
+Figures are built once per key, typically `(dataset key, chart name, range)`,
+and reused on later reruns instead of being rebuilt trace by trace. Hourly
+series are reduced to at most `MAX_POINTS` points per trace before they are
+put in a figure: `lttb` (Largest-Triangle-Three-Buckets) keeps the visual
+shape of smooth series such as prices, `min_max` keeps every bucket's extremes
+so short spikes such as car charging hours are never dropped.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from rollups import dataset_key
+
+MAX_POINTS = 2000
+MAX_CACHED = 32
+
+_lock = threading.Lock()
+# key -> go.Figure, least recently used first
+_figures = OrderedDict()
+
+
+def figure_key(df: pd.DataFrame, chart: str, *parts) -> tuple:
+    """Cache key for a figure of `chart` drawn from the session's dataset `df`."""
+    return (st.session_state.get('df_key') or dataset_key(df), chart, *parts)
+
+
+def data_key(df: pd.DataFrame, chart: str) -> tuple:
+    """Cache key for a figure drawn from a small derived frame, e.g. a monthly table with user input."""
+    return ('data', chart, dataset_key(df))
+
+
+def get_figure(key, build, *args):
+    """`build(*args)`, memoized per `key`; returns the same figure object on a hit."""
+    with _lock:
+        if key in _figures:
+            _figures.move_to_end(key)
+            return _figures[key]
+    fig = build(*args)
+    with _lock:
+        _figures[key] = fig
+        while len(_figures) > MAX_CACHED:
+            _figures.popitem(last=False)
+    return fig
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of `n_out` points of `(x, y)` picked with Largest-Triangle-Three-Buckets."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    # First and last point are kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def min_max(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Sorted indices of the minimum and maximum of `n_out // 2` equal buckets of `y`."""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    buckets = np.arange(n) * (n_out // 2) // n
+    order = np.lexsort((y, buckets))
+    starts = np.searchsorted(buckets[order], np.arange(n_out // 2), side='left')
+    ends = np.append(starts[1:], n)
+    return np.unique(np.concatenate([order[starts], order[ends - 1]]))
+
+
+def downsample(x: pd.Series, y: pd.Series, max_points: int = MAX_POINTS, method: str = 'lttb'):
+    """`(x, y)` reduced to at most `max_points` points with `lttb` or `min_max`."""
+    if len(y) <= max_points:
+        return x, y
+    if method == 'min_max':
+        idx = min_max(y.to_numpy(), max_points)
+    else:
+        keys = pd.DatetimeIndex(x).asi8 if pd.api.types.is_datetime64_any_dtype(x) else x.to_numpy()
+        idx = lttb(keys, y.to_numpy(), max_points)
+    return x.iloc[idx], y.iloc[idx]
@@ -0,0 +1,112 @@
+"""Monthly Clever reconciliation: what charging at home cost vs. what Clever refunded.
+
+Months are keyed as integer periods (pandas monthly ordinals, months since
+1970-01), so the refund rates in `clever_tilbagebetaling.csv` (`month` as
+MM-YY, `sats` in DKK/kWh) are matched with a `searchsorted` instead of a
+string merge. The rate table is loaded once per file version, and
+`reconcile` computes every column of the monthly table in one vectorised pass.
+"""
+import numpy as np
+import pandas as pd
+
+from file_cache import FileCache
+
+CLEVER_CSV = 'clever_tilbagebetaling.csv'
+
+# Monthly Clever subscription, DKK
+SUBSCRIPTION_DKK = 799.0
+# Fixed monthly cost of charging without Clever, DKK
+NO_SUBSCRIPTION_FIXED_DKK = 70.0
+# Afgift refunded per kWh without Clever: 0.90 kr with moms up to 2025, none from 2026
+AFGIFT_REFUND_DKK = 0.9
+AFGIFT_REFUND_UNTIL = pd.Period('2026-01', freq='M').ordinal
+
+def month_keys(months) -> np.ndarray:
+    """Integer month keys of a PeriodIndex, or of anything `pd.PeriodIndex` accepts."""
+    return pd.PeriodIndex(months, freq='M').asi8
+
+
+class CleverRates:
+    """Refund rate per month, looked up by integer month key; unknown months get 0."""
+
+    def __init__(self, keys: np.ndarray, rates: np.ndarray):
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.rates = rates[order]
+
+    @classmethod
+    def from_table(cls, table: pd.DataFrame) -> 'CleverRates':
+        months = pd.to_datetime(table['month'].astype(str), format='%m-%y').dt.to_period('M')
+        return cls(month_keys(months), table['sats'].astype(float).to_numpy())
+
+    def lookup(self, keys) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.int64)
+        if len(self.keys) == 0:
+            return np.zeros(len(keys), dtype=np.float64)
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[pos] == keys, self.rates[pos], 0.0)
+
+
+_tables = FileCache(lambda path: CleverRates.from_table(pd.read_csv(path, dtype={'month': str})))
+
+
+def load_clever_rates(path: str = CLEVER_CSV) -> CleverRates:
+    """Return the rate table for `path`, rebuilt only when the file changes."""
+    return _tables.get(path)
+
+
+def clever_rates_version(path: str = CLEVER_CSV):
+    """Version of the Clever rate CSV (see `FileCache.version`), for keying results built from it."""
+    return _tables.version(path)
+
+
+def reconcile(keys, auto_kwh, total_price, clever_kwh, udeladning_kwh, udeladning_pris: float,
+              rates: CleverRates = None) -> dict:
+    """Monthly reconciliation columns as a dict of aligned arrays.
+
+    `keys` are integer month keys, `auto_kwh` and `total_price` the detected
+    car charging and its cost, `clever_kwh` and `udeladning_kwh` the kWh the
+    user reports from the Clever app and charged away from home (at
+    `udeladning_pris` DKK/kWh).
+    """
+    months = reconcile_months(keys, auto_kwh, total_price, clever_kwh, rates)
+    return {**months, **compare_without_clever(keys, months['adjusted_total'], clever_kwh, udeladning_kwh, udeladning_pris)}
+
+
+def reconcile_months(keys, auto_kwh, total_price, clever_kwh, rates: CleverRates = None) -> dict:
+    """The Clever side of `reconcile`: corrected cost, refund and net price per month."""
+    keys = np.asarray(keys, dtype=np.int64)
+    auto_kwh = np.asarray(auto_kwh, dtype=np.float64)
+    total_price = np.asarray(total_price, dtype=np.float64)
+    clever_kwh = np.asarray(clever_kwh, dtype=np.float64)
+    rates = rates or load_clever_rates()
+
+    average_price = np.divide(total_price, auto_kwh, out=np.zeros_like(total_price), where=auto_kwh > 0)
+    clever_rate = rates.lookup(keys)
+    korrektion_kwh = clever_kwh - auto_kwh
+    adjusted_total = total_price + korrektion_kwh * average_price
+    reimbursed = clever_kwh * clever_rate
+    net_price = adjusted_total - reimbursed
+    return {
+        'average_price': average_price,
+        'clever_rate': clever_rate,
+        'korrektion_kwh_clever': korrektion_kwh,
+        'korrektion_cost': korrektion_kwh * average_price,
+        'adjusted_total': adjusted_total,
+        'reimbursed': reimbursed,
+        'net_price': net_price,
+        'clever_abbonnemnt': np.full(len(keys), SUBSCRIPTION_DKK),
+        'total_udgift_ved_clever_abbonemnt': net_price + SUBSCRIPTION_DKK,
+    }
+
+
+def compare_without_clever(keys, adjusted_total, clever_kwh, udeladning_kwh, udeladning_pris: float) -> dict:
+    """The without-Clever side of `reconcile`: udeladning cost and total without a subscription."""
+    keys = np.asarray(keys, dtype=np.int64)
+    clever_kwh = np.asarray(clever_kwh, dtype=np.float64)
+    udeladning_cost = np.asarray(udeladning_kwh, dtype=np.float64) * float(udeladning_pris)
+    afgift_refund = np.where(keys < AFGIFT_REFUND_UNTIL, AFGIFT_REFUND_DKK, 0.0)
+    return {
+        'udeladning_cost': udeladning_cost,
+        'total_udgift_uden_clever_abbonemnt': adjusted_total + NO_SUBSCRIPTION_FIXED_DKK - clever_kwh * afgift_refund + udeladning_cost,
+    }
@@ -0,0 +1,75 @@
+"""Vectorised cost kernel: hourly cost columns, car/house split and period totals.
+
+Works on aligned float arrays (usage, spot, tarif, afgift per hour):
+`hourly_costs` gives the cost columns, `split_car` the fixed-threshold
+car/house split (the `threshold` detector in detectors.py) and
+`period_totals` the sums. The split and totals are re-run on every threshold
+change, so they make one pass per output column, reuse a single scratch
+buffer for the totals and never go through pandas.
+Missing prices propagate as NaN into the hourly columns and are skipped in the
+totals, like pandas' `sum()`.
+"""
+import numpy as np
+
+
+def as_f64(values) -> np.ndarray:
+    """`values` as a float64 array, without copying if it already is one."""
+    return np.asarray(values, dtype=np.float64)
+
+
+def hourly_costs(usage, spot, tarif, afgift):
+    """`(total_udgift, total_pris_per_kwh)` per hour; independent of the car settings."""
+    usage = as_f64(usage)
+    price = np.add(as_f64(spot), as_f64(tarif))
+    price += as_f64(afgift)
+    total = np.multiply(usage, price)
+    price[usage == 0] = np.nan
+    return total, price
+
+
+def split_car(usage, charge_threshold: float = 5.0, car_max_kwh: float = 11.0):
+    """`(car_charging, car_kwh, house_kwh)`: hours of at least `charge_threshold` kWh charge up to `car_max_kwh`."""
+    usage = as_f64(usage)
+    charging = usage >= float(charge_threshold)
+    car_kwh = np.minimum(usage, float(car_max_kwh))
+    car_kwh[~charging] = 0.0
+    return charging, car_kwh, np.subtract(usage, car_kwh)
+
+
+def period_totals(usage, spot, tarif, afgift, total, price, car_kwh, house_kwh) -> dict:
+    """Sums over a period of the hourly arrays from `hourly_costs` and a car split.
+
+    Keys: usage_kwh, spot_cost, tarif_cost, afgift_cost, total_udgift,
+    car_kwh, house_kwh, car_cost and house_cost (kWh at total_pris_per_kwh),
+    car_charge_cost (car kWh at spot + tarif + afgift with missing prices as
+    0), avg_price (mean total_pris_per_kwh) and peak_spot (max spot price).
+    """
+    usage, spot, tarif, afgift = as_f64(usage), as_f64(spot), as_f64(tarif), as_f64(afgift)
+    total, price, car_kwh, house_kwh = as_f64(total), as_f64(price), as_f64(car_kwh), as_f64(house_kwh)
+    scratch = np.empty_like(usage)
+
+    def weighted(weights, rate):
+        np.multiply(weights, rate, out=scratch)
+        return float(np.nansum(scratch))
+
+    totals = {
+        'usage_kwh': float(np.nansum(usage)),
+        'spot_cost': weighted(usage, spot),
+        'tarif_cost': weighted(usage, tarif),
+        'afgift_cost': weighted(usage, afgift),
+        'total_udgift': float(np.nansum(total)),
+        'car_kwh': float(np.nansum(car_kwh)),
+        'house_kwh': float(np.nansum(house_kwh)),
+        'car_cost': weighted(car_kwh, price),
+        'house_cost': weighted(house_kwh, price),
+    }
+    # Charging price with missing components counted as 0
+    charge_rate = np.nan_to_num(spot, nan=0.0)
+    charge_rate += np.nan_to_num(tarif, nan=0.0)
+    charge_rate += np.nan_to_num(afgift, nan=0.0)
+    totals['car_charge_cost'] = weighted(car_kwh, charge_rate)
+
+    has_price = ~np.isnan(price)
+    totals['avg_price'] = float(price[has_price].mean()) if has_price.any() else float('nan')
+    totals['peak_spot'] = float(np.nanmax(spot)) if (~np.isnan(spot)).any() else float('nan')
+    return totals
@@ -0,0 +1,103 @@
+"""Read-only, column-projected views of the hourly dataset for the tabs.
+
+With pandas Copy-on-Write (always on in pandas 3, the minimum in
+requirements.txt), projections and row slices share memory with the
+session's frame; a tab that adds or changes a column only copies that column,
+never the frame and never the shared data. Tabs declare the columns they need
+in a module-level `COLUMNS` list and receive `column_view(df, COLUMNS)`.
+Date filtering slices the time-sorted frame by binary search (`filter_by_view_range`),
+and tables are paged on the server (`select_rows`, `page_view`) so only the
+visible rows are sent to the browser.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from hour_keys import as_date
+
+
+def column_view(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Project `df` onto the `columns` it has, without copying column data."""
+    return df[[c for c in columns if c in df.columns]]
+
+
+def column(df: pd.DataFrame, name: str, default=0.0) -> pd.Series:
+    """Column `name` of `df`, or a constant `default` column if `df` doesn't have it."""
+    return df[name] if name in df.columns else pd.Series(default, index=df.index)
+
+
+def filter_by_view_range(df: pd.DataFrame, view_range) -> pd.DataFrame:
+    """Rows of `df` whose `time` falls on the dates of a Streamlit `date_input` value.
+
+    `view_range` may be a single date, a `(from, to)` tuple (inclusive), or a
+    `(from,)` tuple or contain None while the user is still selecting (the
+    missing side is open). `df` must be sorted by
+    `time` (as the fetch stage returns it): the bounds are found with two
+    binary searches and the result is a zero-copy row slice. Returns `df`
+    unchanged if the value cannot be parsed.
+    """
+    try:
+        if isinstance(view_range, (tuple, list)):
+            if len(view_range) == 0:
+                return df
+            # `(d,)` while the user is still picking the end: filter on the start only
+            vf_from = view_range[0]
+            vf_to = view_range[1] if len(view_range) > 1 else None
+        else:
+            vf_from = vf_to = view_range
+        vf_from, vf_to = as_date(vf_from), as_date(vf_to)
+        if vf_from is None and vf_to is None:
+            return df
+        if vf_from is not None and vf_to is not None and vf_from > vf_to:
+            vf_from, vf_to = vf_to, vf_from
+
+        times = pd.DatetimeIndex(df['time'])
+        i0, i1 = 0, len(times)
+        if vf_from is not None:
+            i0 = times.searchsorted(_day_start(vf_from, times.tz), side='left')
+        if vf_to is not None:
+            i1 = times.searchsorted(_day_start(vf_to + timedelta(days=1), times.tz), side='left')
+        return df.iloc[i0:i1]
+    except Exception:
+        return df
+
+
+def _day_start(day: date, tz) -> pd.Timestamp:
+    ts = pd.Timestamp(day)
+    return ts.tz_localize(tz) if tz is not None else ts
+
+
+def _sort_values(col: pd.Series) -> np.ndarray:
+    if isinstance(col.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_any_dtype(col):
+        return pd.DatetimeIndex(col).asi8.astype(np.float64)
+    return col.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def select_rows(df: pd.DataFrame, filters=None, sort_by=None, ascending=True) -> np.ndarray:
+    """Row positions of `df` that pass `filters`, in `sort_by` order.
+
+    `filters` maps a column to a `(low, high)` inclusive range, or to a value
+    the column must equal (e.g. True for a boolean column). Missing values
+    sort last in both directions; ties keep time order.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, cond in (filters or {}).items():
+        values = df[col].to_numpy()
+        if isinstance(cond, tuple):
+            mask &= (values >= cond[0]) & (values <= cond[1])
+        else:
+            mask &= values == cond
+    positions = np.flatnonzero(mask)
+    if sort_by is None or (sort_by == 'time' and ascending):
+        # The dataset is already in time order
+        return positions
+    keys = _sort_values(df[sort_by])[positions]
+    order = np.argsort(keys if ascending else -keys, kind='stable')
+    return positions[order]
+
+
+def page_view(df: pd.DataFrame, positions: np.ndarray, page: int, page_size: int) -> pd.DataFrame:
+    """Rows `positions[(page-1)*page_size : page*page_size]` of `df` (pages count from 1)."""
+    start = max(page - 1, 0) * page_size
+    return df.take(positions[start:start + page_size])
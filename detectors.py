@@ -0,0 +1,147 @@
+"""Car charging detectors: which hours the car charged and how many kWh went to it.
+
+A detector takes the hourly usage in time order with its hour keys (see
+hour_keys.py) and local hour of day, plus the user's `charge_threshold` and
+`car_max_kwh`, and returns `(car_charging, car_kwh)`. Everything the car did
+not take is house usage. All detectors are plain NumPy over the whole period:
+
+- `threshold`: hours of at least `charge_threshold` kWh charge up to
+  `car_max_kwh` (the original rule, see `cost_kernel.split_car`).
+- `baseline`: the same hours, but the house keeps its usual usage for that
+  hour of day (a rolling mean over the previous `BASELINE_DAYS` days of
+  non-charging hours) and only the excess goes to the car.
+- `sessions`: charging sessions are runs of consecutive threshold hours; the
+  hour before and after a run counts as a partial ramp-up/ramp-down hour when
+  it is at least `RAMP_MIN_KWH` above the baseline, so the first and last
+  part of a charge is not booked to the house.
+
+`baseline` and `sessions` look at the household's total per hour: rows of
+several metering points for the same hour key are summed first and the car
+kWh of an hour is split back over its rows in proportion to their usage.
+
+Register a new detector by adding it to `DETECTORS` (and `LABELS` for the UI).
+"""
+import numpy as np
+
+import cost_kernel
+from cost_kernel import as_f64
+
+BASELINE_DAYS = 14
+RAMP_MIN_KWH = 0.5
+
+
+def household_baseline(usage, hour_of_day, exclude, days: int = BASELINE_DAYS) -> np.ndarray:
+    """Rolling mean house usage per hour of day over the previous `days` days.
+
+    Expects one row per hour in time order (see `_per_hour`). Hours where
+    `exclude` is set (charging) are left out of the mean. An hour with no
+    usable history gets the mean of all usable hours at that hour of day, or
+    of all usable hours if that hour of day has none (0 without any).
+    """
+    usage = as_f64(usage)
+    hour_of_day = np.asarray(hour_of_day, dtype=np.int64)
+    n = len(usage)
+    if n == 0:
+        return np.zeros(0)
+    keep = ~np.asarray(exclude, dtype=bool)
+
+    # Hours grouped by hour of day, each group in time order: with one row per hour a day back
+    # is one position back (gaps in the data just stretch the window)
+    order = np.argsort(hour_of_day, kind='stable')
+    sorted_hod = hour_of_day[order]
+    weights = keep[order].astype(np.float64)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(keep, usage, 0.0)[order])])
+    counts = np.concatenate([[0.0], np.cumsum(weights)])
+
+    pos = np.arange(n)
+    group_start = np.searchsorted(sorted_hod, sorted_hod, side='left')
+    group_end = np.searchsorted(sorted_hod, sorted_hod, side='right')
+    lo = np.maximum(group_start, pos - days)
+    window_sum, window_count = sums[pos] - sums[lo], counts[pos] - counts[lo]
+    group_sum, group_count = sums[group_end] - sums[group_start], counts[group_end] - counts[group_start]
+
+    overall = sums[-1] / counts[-1] if counts[-1] > 0 else 0.0
+    fallback = np.divide(group_sum, group_count, out=np.full(n, overall), where=group_count > 0)
+    baseline = np.divide(window_sum, window_count, out=fallback, where=window_count > 0)
+    out = np.empty(n)
+    out[order] = baseline
+    return out
+
+
+def _per_hour(usage, keys, hour_of_day):
+    """`(usage, hour_of_day, inverse, keys)` with one entry per hour key, usage summed over its rows.
+
+    `keys` must be in time order; `values[inverse]` maps per-hour values back
+    to the rows. Without duplicate keys the rows are returned as they are.
+    """
+    usage = as_f64(usage)
+    keys = np.asarray(keys, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, np.diff(keys) != 0])
+    if len(starts) == len(keys):
+        return usage, np.asarray(hour_of_day), np.arange(len(keys)), keys
+    inverse = np.cumsum(np.r_[False, np.diff(keys) != 0])
+    return np.add.reduceat(usage, starts), np.asarray(hour_of_day)[starts], inverse, keys[starts]
+
+
+def _to_rows(usage, hourly_usage, inverse, charging, car_kwh):
+    """Per-hour `charging, car_kwh` back on the rows, car kWh split by each row's share of the hour's usage."""
+    share = np.divide(usage, hourly_usage[inverse], out=np.zeros(len(usage)), where=hourly_usage[inverse] > 0)
+    return charging[inverse], car_kwh[inverse] * share
+
+
+def _next_to(mask, keys) -> np.ndarray:
+    """Hours directly before or after (by hour key) an hour in `mask`; one row per hour."""
+    mask = np.asarray(mask, dtype=bool)
+    adjacent = np.diff(np.asarray(keys, dtype=np.int64)) == 1
+    out = np.zeros(len(mask), dtype=bool)
+    out[:-1] |= mask[1:] & adjacent
+    out[1:] |= mask[:-1] & adjacent
+    return out & ~mask
+
+
+def threshold(usage, keys, hour_of_day, charge_threshold: float, car_max_kwh: float):
+    charging, car_kwh, _ = cost_kernel.split_car(usage, charge_threshold, car_max_kwh)
+    return charging, car_kwh
+
+
+def baseline(usage, keys, hour_of_day, charge_threshold: float, car_max_kwh: float):
+    usage = as_f64(usage)
+    hourly, hours, inverse, _ = _per_hour(usage, keys, hour_of_day)
+    charging = hourly >= float(charge_threshold)
+    house = household_baseline(hourly, hours, charging)
+    car_kwh = np.clip(hourly - house, 0.0, float(car_max_kwh))
+    car_kwh[~charging] = 0.0
+    return _to_rows(usage, hourly, inverse, charging, car_kwh)
+
+
+def sessions(usage, keys, hour_of_day, charge_threshold: float, car_max_kwh: float):
+    usage = as_f64(usage)
+    hourly, hours, inverse, keys = _per_hour(usage, keys, hour_of_day)
+    core = hourly >= float(charge_threshold)
+    around = _next_to(core, keys)
+    # Ramp hours would inflate the house baseline, so they are left out of it too
+    house = household_baseline(hourly, hours, core | around)
+    excess = np.clip(hourly - house, 0.0, float(car_max_kwh))
+    charging = core | (around & (excess >= RAMP_MIN_KWH))
+    car_kwh = np.where(charging, excess, 0.0)
+    return _to_rows(usage, hourly, inverse, charging, car_kwh)
+
+
+DETECTORS = {
+    'threshold': threshold,
+    'baseline': baseline,
+    'sessions': sessions,
+}
+
+LABELS = {
+    'threshold': 'Fast grænse',
+    'baseline': 'Grænse minus husets normale forbrug',
+    'sessions': 'Opladningssessioner (inkl. start- og sluttimer)',
+}
+
+
+def detect(name: str, usage, keys, hour_of_day, charge_threshold: float = 5.0, car_max_kwh: float = 11.0):
+    """`(car_charging, car_kwh, house_kwh)` from the detector `name`; unknown names use `threshold`."""
+    usage = as_f64(usage)
+    charging, car_kwh = DETECTORS.get(name, threshold)(usage, keys, hour_of_day, charge_threshold, car_max_kwh)
+    return charging, car_kwh, np.subtract(usage, car_kwh)
@@ -1,29 +1,35 @@
 #!/usr/bin/env python3
-import pandas as pd
-from datetime import datetime, timedelta
-from fetch_power_data import fetch_el_price_range
-
-# Define periods to download
-periods = [
-    ("2024-01-01", "2025-12-31"),
-    ("2026-01-01", "2026-01-31")
-]
-
-all_prices = []
-for start, end in periods:
-    print(f"Fetching prices from {start} to {end}...")
-    df = fetch_el_price_range(start, end, zone="DK2")
-    if not df.empty:
-        # Add moms (25%) to spot price
-        if 'DKK_per_kWh' in df.columns:
-            df['DKK_per_kWh'] = df['DKK_per_kWh'] * 1.25
-        all_prices.append(df)
+"""Pre-fill the price cache for a period and optionally export it to CSV.
+
+Days already in the cache are skipped, so the script can be re-run at any time
+to top up the store, e.g. `python download_prices_to_csv.py --start 2024-01-01`.
+"""
+import argparse
+from datetime import date, datetime
+
+import price_cache
+
+
+def _parse_date(s: str) -> date:
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--start', type=_parse_date, default=date(2024, 1, 1), help='First day, YYYY-MM-DD')
+parser.add_argument('--end', type=_parse_date, default=date.today(), help='Last day, YYYY-MM-DD (default: today)')
+parser.add_argument('--zone', default='DK2', help="'DK1' or 'DK2'")
+parser.add_argument('--csv', default=None, help='Also export the period to this CSV file (e.g. historic_el_prices.csv)')
+args = parser.parse_args()
+
+print(f"Filling price cache from {args.start} to {args.end} ({args.zone})...")
+prices = price_cache.get_prices(args.start, args.end, zone=args.zone)
+missing = price_cache.missing_days(args.start, args.end, zone=args.zone)
+print(f"{len(prices)} hours cached, {len(missing)} day(s) still missing")
+
+if args.csv:
+    if not prices.empty:
+        # Prices in the cache already include moms (25%)
+        prices.to_frame().to_csv(args.csv)
+        print(f"Saved prices to {args.csv}")
     else:
-        print(f"No prices found for {start} to {end}")
-
-if all_prices:
-    df_all = pd.concat(all_prices, ignore_index=True)
-    df_all.to_csv("historic_el_prices.csv", index=False)
-    print("Saved prices to historic_el_prices.csv")
-else:
-    print("No price data to save.")
+        print("No price data to save.")
@@ -0,0 +1,255 @@
+"""Helpers for the Eloverblik customer API (https://api.eloverblik.dk/CustomerApi/index.html)."""
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from hour_keys import LOCAL_TZ, as_date
+from http_client import get_session, request_with_retry
+
+API_BASE = 'https://api.eloverblik.dk/customerapi/api'
+
+# Request limits of the gettimeseries endpoint
+MAX_WINDOW_DAYS = 730
+MAX_POINTS_PER_REQUEST = 10
+
+# Data access tokens are valid for hours; refresh well before they expire
+ACCESS_TOKEN_TTL = 60 * 60
+METERING_POINTS_TTL = 60 * 60
+
+# Seconds per point for the period resolutions the API returns
+_RESOLUTION_SECONDS = {'PT1H': 3600, 'PT15M': 900}
+
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                # Evict expired entries first, then the one closest to expiry
+                self._data = {k: v for k, v in self._data.items() if v[0] > now}
+                if len(self._data) >= self.max_entries:
+                    del self._data[min(self._data, key=lambda k: self._data[k][0])]
+            self._data[key] = (now + self.ttl, value)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class AccessTokenRejected(Exception):
+    """The API answered 401 to a (possibly cached) data access token."""
+
+
+class RefreshTokenRejected(Exception):
+    """The refresh token can't be exchanged for a working access token (invalid, expired or revoked)."""
+
+
+_access_tokens = TTLCache(ACCESS_TOKEN_TTL)
+_metering_points = TTLCache(METERING_POINTS_TTL)
+
+
+def token_key(refresh_token: str) -> str:
+    """Key for a refresh token (its owner) in caches; the raw token itself is never kept."""
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def get_access_token(refresh_token: str):
+    """Exchange a refresh token for a data access token, reusing it until the TTL expires.
+
+    Returns None if the refresh token is rejected.
+    """
+    key = token_key(refresh_token)
+    access = _access_tokens.get(key)
+    if access is not None:
+        return access
+    r, _ = request_with_retry(get_session(), 'GET', f'{API_BASE}/token',
+                              headers={'Authorization': f'Bearer {refresh_token}'})
+    if r.status_code != 200:
+        print(f'Error: {r.status_code} - Token invalid/expired')
+        return None
+    access = r.json()['result']
+    _access_tokens.set(key, access)
+    return access
+
+
+def get_metering_points(refresh_token: str, access: str) -> list:
+    """Metering point ids for the refresh token's owner, cached like the access token.
+
+    Raises `AccessTokenRejected` on a 401; other errors give an empty list that is not cached.
+    """
+    key = token_key(refresh_token)
+    points = _metering_points.get(key)
+    if points is not None:
+        return points
+    r, _ = request_with_retry(get_session(), 'GET', f'{API_BASE}/meteringpoints/meteringpoints',
+                              headers={'Authorization': f'Bearer {access}'})
+    if r.status_code == 401:
+        raise AccessTokenRejected()
+    if r.status_code != 200:
+        print(f'Error: {r.status_code} - Could not get metering points')
+        return []
+    points = [m['meteringPointId'] for m in r.json()['result']]
+    _metering_points.set(key, points)
+    return points
+
+
+def forget_token(refresh_token: str):
+    """Drop cached access token and metering points, e.g. after the token was revoked."""
+    key = token_key(refresh_token)
+    _access_tokens.pop(key)
+    _metering_points.pop(key)
+
+
+def with_access(refresh_token: str, call):
+    """`call(access)` with the refresh token's access token, or None if the token is rejected.
+
+    If the API rejects a cached access token (`AccessTokenRejected`), both
+    cache entries are dropped, the refresh token is exchanged again once and
+    `call` is retried.
+    """
+    for attempt in range(2):
+        access = get_access_token(refresh_token)
+        if access is None:
+            return None
+        try:
+            return call(access)
+        except AccessTokenRejected:
+            forget_token(refresh_token)
+    print('Error: 401 - Access token rejected')
+    return None
+
+
+def _period_start_ns(period, default_start) -> int:
+    start_str = period.get('timeInterval', {}).get('start')
+    if start_str:
+        ts = pd.Timestamp(start_str.replace('Z', '+00:00'))
+    else:
+        ts = pd.Timestamp(str(default_start))
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(LOCAL_TZ)
+    return ts.tz_convert('UTC').as_unit('ns').value
+
+
+def parse_timeseries(results, default_start=None) -> pd.DataFrame:
+    """Turn `gettimeseries` results into a `meteringPointId, time, usage_kwh` frame.
+
+    Points are counted first so quantities and timestamps are written into
+    preallocated arrays period by period; timestamps are generated from each
+    period start instead of per point. `time` is tz-aware Europe/Copenhagen.
+    """
+    periods = []
+    total = 0
+    for result in results or []:
+        doc = result.get('MyEnergyData_MarketDocument') or {}
+        for ts in doc.get('TimeSeries') or []:
+            point_id = ts.get('mRID') or result.get('id')
+            for period in ts.get('Period') or []:
+                points = period.get('Point') or []
+                if points:
+                    periods.append((point_id, period, points))
+                    total += len(points)
+
+    times = np.empty(total, dtype=np.int64)
+    usage = np.empty(total, dtype=np.float64)
+    point_ids = np.empty(total, dtype=object)
+    offset = 0
+    for point_id, period, points in periods:
+        n = len(points)
+        step_ns = _RESOLUTION_SECONDS.get(period.get('resolution'), 3600) * 10**9
+        times[offset:offset + n] = _period_start_ns(period, default_start) + np.arange(n, dtype=np.int64) * step_ns
+        usage[offset:offset + n] = [p.get('out_Quantity.quantity', 0) for p in points]
+        point_ids[offset:offset + n] = point_id
+        offset += n
+
+    return pd.DataFrame({
+        'meteringPointId': point_ids,
+        'time': pd.DatetimeIndex(times.view('datetime64[ns]')).tz_localize('UTC').tz_convert(LOCAL_TZ),
+        'usage_kwh': usage,
+    })
+
+
+def split_windows(from_date, to_date, window_days: int = MAX_WINDOW_DAYS) -> list:
+    """Split `from_date..to_date` into consecutive `(start, end)` windows of at most `window_days`."""
+    start, end = as_date(from_date), as_date(to_date)
+    windows = []
+    while start < end:
+        stop = min(start + timedelta(days=window_days), end)
+        windows.append((start, stop))
+        start = stop
+    return windows or [(start, end)]
+
+
+def _fetch_window(session, access, batch, start, end, aggregation):
+    url = f'{API_BASE}/meterdata/gettimeseries/{start}/{end}/{aggregation}'
+    try:
+        r, _ = request_with_retry(session, 'POST', url, retries=3, backoff=1.0, timeout=60,
+                                  json={'meteringPoints': {'meteringPoint': list(batch)}},
+                                  headers={'Authorization': f'Bearer {access}'})
+        if r.status_code == 401:
+            raise AccessTokenRejected()
+        data = r.json()
+    except AccessTokenRejected:
+        raise
+    except Exception as e:
+        return [], f'{e}'
+    if r.status_code != 200 or not data.get('result'):
+        return [], f'status {r.status_code}'
+    return data['result'], None
+
+
+def fetch_timeseries(access, points, from_date, to_date, aggregation: str = 'Hour', max_workers: int = 4,
+                     window_days: int = MAX_WINDOW_DAYS, batch_size: int = MAX_POINTS_PER_REQUEST) -> pd.DataFrame:
+    """Download meter data for `points` over any date range.
+
+    The range is split into API-sized windows and the points into batches of
+    `batch_size`; every (batch, window) request runs on a bounded thread pool
+    sharing one session. Results are parsed once and returned sorted by
+    `meteringPointId, time` with window overlaps removed, independent of the
+    order requests complete in. Raises `AccessTokenRejected` if the API
+    rejects `access`.
+    """
+    points = list(points)
+    if not points:
+        return parse_timeseries([])
+    batches = [points[i:i + batch_size] for i in range(0, len(points), batch_size)]
+    jobs = [(batch, start, end) for batch in batches for start, end in split_windows(from_date, to_date, window_days)]
+    session = get_session()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+        responses = list(pool.map(lambda job: _fetch_window(session, access, *job, aggregation), jobs))
+
+    all_results = []
+    for (batch, start, end), (results, error) in zip(jobs, responses):
+        if error:
+            print(f'No data for {", ".join(batch)} ({start} to {end}): {error}')
+            continue
+        for result in results:
+            if result.get('success') is False:
+                print(f'No data for {result.get("id")} ({start} to {end}): {result.get("errorText")}')
+        all_results.extend(results)
+
+    df = parse_timeseries(all_results, default_start=from_date)
+    df = df.drop_duplicates(subset=['meteringPointId', 'time'], keep='first')
+    return df.sort_values(['meteringPointId', 'time'], kind='stable').reset_index(drop=True)
@@ -0,0 +1,73 @@
+"""On-demand file exports of the hourly table (CSV, gzip'ed CSV, Parquet).
+
+Files are only built when the user clicks download: the tab hands
+`st.download_button` a callable. CSV is written in row chunks so at most one
+chunk's text exists at a time, and finished files are kept in a small cache
+keyed by dataset and period, so downloading the same period again is free.
+"""
+import gzip
+import importlib.util
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+CHUNK_ROWS = 20_000
+MAX_CACHED = 4
+
+# Parquet needs pyarrow (normally installed with streamlit)
+HAS_PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+# format -> (label, file extension, mime type)
+FORMATS = {
+    'csv': ('CSV', 'csv', 'text/csv'),
+    'csv.gz': ('CSV (gzip)', 'csv.gz', 'application/gzip'),
+}
+if HAS_PARQUET:
+    FORMATS['parquet'] = ('Parquet', 'parquet', 'application/vnd.apache.parquet')
+
+_lock = threading.Lock()
+# (key, fmt) -> bytes, least recently used first
+_files = OrderedDict()
+
+
+def write_csv(df: pd.DataFrame, fileobj, chunk_rows: int = CHUNK_ROWS):
+    """Write `df` as UTF-8 CSV to a binary `fileobj`, `chunk_rows` rows at a time."""
+    fileobj.write(df.iloc[:0].to_csv(index=False).encode('utf-8'))
+    for start in range(0, len(df), chunk_rows):
+        fileobj.write(df.iloc[start:start + chunk_rows].to_csv(index=False, header=False).encode('utf-8'))
+
+
+def build_file(df: pd.DataFrame, fmt: str) -> bytes:
+    """Contents of `df` exported as `fmt` (a key of `FORMATS`)."""
+    buf = io.BytesIO()
+    if fmt == 'csv':
+        write_csv(df, buf)
+    elif fmt == 'csv.gz':
+        with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=6) as gz:
+            write_csv(df, gz)
+    elif fmt == 'parquet' and HAS_PARQUET:
+        df.to_parquet(buf, index=False)
+    else:
+        raise ValueError(f'Unknown export format: {fmt}')
+    return buf.getvalue()
+
+
+def export_file(df: pd.DataFrame, fmt: str, key) -> bytes:
+    """`build_file(df, fmt)`, reusing the bytes from earlier calls with the same `key`.
+
+    `key` must identify the exported rows and columns, e.g. the dataset key
+    plus the selected period.
+    """
+    cache_key = (key, fmt)
+    with _lock:
+        if cache_key in _files:
+            _files.move_to_end(cache_key)
+            return _files[cache_key]
+    data = build_file(df, fmt)
+    with _lock:
+        _files[cache_key] = data
+        while len(_files) > MAX_CACHED:
+            _files.popitem(last=False)
+    return data
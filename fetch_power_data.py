@@ -1,88 +1,49 @@
 #!/usr/bin/env python3
-import requests
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-
-def fetch_el_price_range(start_date: str, end_date: str, zone: str = "DK2") -> pd.DataFrame:
-    """Fetch hourly electricity prices from Elprisenligenu API."""
-    start = datetime.strptime(start_date, "%Y-%m-%d")
-    end = datetime.strptime(end_date, "%Y-%m-%d")
-    all_data = []
-
-    for n in range((end - start).days + 1):
-        current = start + timedelta(days=n)
-        date_str = current.strftime("%Y/%m-%d")
-        url = f"https://www.elprisenligenu.dk/api/v1/prices/{date_str}_{zone}.json"
-
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            df = pd.DataFrame(data)[['time_start', 'DKK_per_kWh']]
-            # Parse as UTC, then convert to Europe/Copenhagen (local time with DST)
-            df['time_start_original'] = df['time_start']  # Keep original for debugging
-            df['time_start'] = pd.to_datetime(df['time_start'], utc=True)
-            df['time_start'] = df['time_start'].dt.tz_convert('Europe/Copenhagen')
-            # Add time_end column (1 hour after time_start)
-            df['time_end'] = df['time_start'] + pd.Timedelta(hours=1)
-            all_data.append(df)
-        except Exception as e:
-            print(f"Failed for {date_str}: {e}")
-            
-            
-    return pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
+
+from afgift import load_afgift_schedule
+import cost_kernel
+import detectors
+import eloverblik
+from hour_keys import align, describe_hours, hour_keys, local_times
+import meter_cache
+import price_cache
+from tariffs import TARIFF_CSV, load_tariff_table
 
 def fetch_tariff_data(access_token: str, points: list, start_ts: pd.Timestamp, end_ts: pd.Timestamp) -> pd.Series:
-    """Load manual tariff CSV (`tariffs_manual.csv`) and build hourly series.
+    """Build an hourly tariff series from the manual tariff CSV (`tariffs_manual.csv`).
 
-    CSV columns: month_start,month_end,hour_start,hour_end,price
-    month ranges may wrap (e.g. 10 to 3).
+    CSV columns: month_start,month_end,hour_start,hour_end,price[,valid_from]
+    month ranges may wrap (e.g. 10 to 3). The CSV is parsed once per process
+    into a lookup table (see tariffs.py).
     """
-    # Ensure start_ts and end_ts are in Europe/Copenhagen, then strip tzinfo before passing to pd.date_range with explicit tz
-    if start_ts.tzinfo is None:
-        start_ts = start_ts.tz_localize('Europe/Copenhagen')
-    else:
-        start_ts = start_ts.tz_convert('Europe/Copenhagen')
-    if end_ts.tzinfo is None:
-        end_ts = end_ts.tz_localize('Europe/Copenhagen')
-    else:
-        end_ts = end_ts.tz_convert('Europe/Copenhagen')
-    # Remove tzinfo before passing to pd.date_range with tz argument
-    idx = pd.date_range(start=start_ts.floor('h').replace(tzinfo=None), end=end_ts.floor('h').replace(tzinfo=None), freq='h', tz=ZoneInfo('Europe/Copenhagen'))
-    s = pd.Series(0.0, index=idx)
+    # Build the hours in UTC so the October fall-back hour appears twice and the March gap not at all
+    keys = np.arange(hour_keys([start_ts])[0], hour_keys([end_ts])[0] + 1, dtype=np.int64)
+    idx = local_times(keys)
     try:
-        tariffs = pd.read_csv('tariffs_manual.csv')
+        table = load_tariff_table(TARIFF_CSV)
     except Exception as e:
         print('Could not read tariffs_manual.csv:', e)
-        return s
+        return pd.Series(0.0, index=idx)
 
-    for _, row in tariffs.iterrows():
-        ms = int(row['month_start'])
-        me = int(row['month_end'])
-        hs = int(row['hour_start'])
-        he = int(row['hour_end'])
-        price = float(row['price'])
+    # One vectorised gather from the (version, month, hour) table instead of masking per rule
+    return pd.Series(table.rates(idx), index=idx)
 
-        if ms <= me:
-            month_mask = (s.index.month >= ms) & (s.index.month <= me)
-        else:
-            month_mask = (s.index.month >= ms) | (s.index.month <= me)
-
-        hour_mask = (s.index.hour >= hs) & (s.index.hour < he)
-        mask = month_mask & hour_mask
-        s.loc[mask] = price
+def resolve_period(from_date=None, to_date=None):
+    """Default period: the 30 days up to today."""
+    if to_date is None or from_date is None:
+        to_date = datetime.now().date() if to_date is None else to_date
+        from_date = (to_date - timedelta(days=30)) if from_date is None else from_date
+    return from_date, to_date
 
-    return s
 
-def fetch_power_data(refresh_token=None, charge_threshold: float = 5.0, car_max_kwh: float = 11.0, from_date=None, to_date=None):
-        # --- CHANGE: Price fetching now uses CSV for historical data ---
-        # Loads prices from 'el_prices_2024_2026.csv' for 2024-2025 and Jan 2026.
-        # Only fetches missing hours from API, reducing API calls and speeding up app.
-        # See download_prices_to_csv.py for CSV generation.
-    """Fetch hourly power usage for a period and merge with prices.
+def fetch_usage(refresh_token=None, from_date=None, to_date=None):
+    """Hourly `meteringPointId, time, usage_kwh` for all metering points of the token, or None.
 
-    If `refresh_token` is None, the function will read 'token.txt'.
+    If `refresh_token` is None, the function will read 'token.txt'. Raises
+    `eloverblik.RefreshTokenRejected` if Eloverblik rejects the token.
     """
     if refresh_token is None:
         with open('token.txt') as f:
@@ -90,239 +51,124 @@ def fetch_power_data(refresh_token=None, charge_threshold: float = 5.0, car_max_
     else:
         refresh = refresh_token
 
-    # Get access token
-    r = requests.get('https://api.eloverblik.dk/customerapi/api/token',
-                     headers={'Authorization': f'Bearer {refresh}'})
-    if r.status_code != 200:
-        print(f'Error: {r.status_code} - Token invalid/expired')
-        exit(1)
-
-    access = r.json()['result']
-
-    # Get metering points
-    r = requests.get('https://api.eloverblik.dk/customerapi/api/meteringpoints/meteringpoints',
-                     headers={'Authorization': f'Bearer {access}'})
-    points = [m['meteringPointId'] for m in r.json()['result']]
-    print(f'Found {len(points)} metering point(s)\n')
-
-    # Determine date range
-    if to_date is None or from_date is None:
-        to_date = datetime.now().date() if to_date is None else to_date
-        from_date = (to_date - timedelta(days=30)) if from_date is None else from_date
-
-    all_power_data = []
-    for point in points:
-        # Request HOUR aggregation instead of Day
-        r = requests.post(f'https://api.eloverblik.dk/customerapi/api/meterdata/gettimeseries/{from_date}/{to_date}/Hour',
-                          json={'meteringPoints': {'meteringPoint': [point]}},
-                          headers={'Authorization': f'Bearer {access}'})
-        data = r.json()
-        
-        if r.status_code != 200 or not data.get('result'):
-            print(f'No data for {point}')
-            continue
-            
-        for result in data['result']:
-            doc = result.get('MyEnergyData_MarketDocument', {})
-            for ts in doc.get('TimeSeries', []):
-                for period in ts.get('Period', []):
-                    start_str = period.get('timeInterval', {}).get('start', str(from_date))
-                    # Parse ISO format with timezone (UTC) and convert to Copenhagen time
-                    start_date = datetime.fromisoformat(start_str.replace('Z', '+00:00'))
-                    start_date = start_date.astimezone(ZoneInfo('Europe/Copenhagen'))
-                    
-                    for idx, p in enumerate(period.get('Point', []), 0):
-                        qty = float(p.get('out_Quantity.quantity', 0))
-                        hour_time = start_date + timedelta(hours=idx)
-                        all_power_data.append({
-                            'time': hour_time,
-                            'usage_kwh': qty
-                        })
-
-    # Create DataFrame from power data
-    df_power = pd.DataFrame(all_power_data)
+    def download(access):
+        # Metering points are cached alongside the access token
+        points = eloverblik.get_metering_points(refresh, access)
+        print(f'Found {len(points)} metering point(s)\n')
+        # Read cached meter data and download only missing hours (API-sized windows, concurrently)
+        return meter_cache.fetch_with_cache(access, points, *resolve_period(from_date, to_date),
+                                            owner=eloverblik.token_key(refresh))
+
+    # Access token is cached in-process per refresh token hash; exchanged again if the API rejects it
+    df_power = eloverblik.with_access(refresh, download)
+    if df_power is None:
+        raise eloverblik.RefreshTokenRejected()
     if df_power.empty:
         print('No power data found')
         return None
+    return df_power
 
-    # --- DEBUG: Show all rows of usage and price data before join ---
-    # (df_prices is not available yet, so only print df_power here)
-    #print("\n--- DEBUG: df_power (usage) ---")
-    #print(df_power.head(20))
-    
-    # Ensure both are timezone-aware and floored to hour in Europe/Copenhagen, then create naive local time for join
-    df_power['time'] = pd.to_datetime(df_power['time'])
-    #print("\n--- DEBUG: df_power (usage) --- after datetime conversion ---")
-    #print(df_power.head(20))
-    # Remove all data for the DST transition hour (last Sunday of October, 02:00-02:59) for any year
-    def is_last_sunday_of_oct(dt):
-        # Accepts both pd.Timestamp and datetime
-        if hasattr(dt, 'month') and hasattr(dt, 'weekday'):
-            if dt.month == 10 and dt.weekday() == 6 and dt.day >= 25:
-                # Find last Sunday of October for this year
-                last_oct = datetime(dt.year, 10, 31)
-                last_sunday = last_oct - timedelta(days=(last_oct.weekday() - 6) % 7)
-                return dt.day == last_sunday.day
-        return False
-
-
-
-    # --- Price fetching logic updated ---
-    # Try to load historical prices from CSV, only fetch missing prices from API
-    print('Loading historical prices from CSV if available...')
+
+def load_spot_prices(from_date, to_date) -> pd.Series:
+    """Spot prices (DKK/kWh incl. moms) for every hour of the local dates `from_date..to_date`."""
+    # Prices come from the self-filling price cache: stored hours are read from the
+    # columnar store and only days not covered yet are fetched (and persisted) from the API
+    print('Loading prices from price cache...')
     try:
-        df_prices_hist = pd.read_csv('historic_el_prices.csv')
-        df_prices_hist['time_start'] = pd.to_datetime(df_prices_hist['time_start'])
-        df_prices_hist['time_start'] = df_prices_hist['time_start'].dt.tz_localize('Europe/Copenhagen')
+        return price_cache.get_prices(from_date, to_date, zone='DK2')
     except Exception as e:
-        print('No historical price CSV found or error:', e)
-        df_prices_hist = pd.DataFrame()
-
-    # Determine which hours are missing from CSV
-    from_dt = pd.to_datetime(str(from_date)).tz_localize('Europe/Copenhagen')
-    to_dt = pd.to_datetime(str(to_date)).tz_localize('Europe/Copenhagen')
-    hours_needed = pd.date_range(start=from_dt, end=to_dt, freq='h', tz='Europe/Copenhagen')
-    if not df_prices_hist.empty:
-        hours_in_csv = pd.DatetimeIndex(df_prices_hist['time_start'])
-        hours_missing = hours_needed.difference(hours_in_csv)
-    else:
-        hours_missing = hours_needed
-
-    # Fetch missing prices from API
-    df_prices_api = pd.DataFrame()
-    if len(hours_missing) > 0:
-        print(f'Fetching {len(hours_missing)} missing hours from API...')
-        # Group missing hours by month for efficient API calls
-        months = sorted(set([(dt.year, dt.month) for dt in hours_missing]))
-        for year, month in months:
-            start = pd.Timestamp(year=year, month=month, day=1, tz='Europe/Copenhagen')
-            end = (start + pd.offsets.MonthEnd(1))
-            # Clip to needed range
-            start = max(start, hours_missing[0])
-            end = min(end, hours_missing[-1])
-            df = fetch_el_price_range(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), zone='DK2')
-            if not df.empty:
-                if 'DKK_per_kWh' in df.columns:
-                    df['DKK_per_kWh'] = df['DKK_per_kWh'] * 1.25
-                df_prices_api = pd.concat([df_prices_api, df], ignore_index=True)
-        # Filter to only needed hours
-        df_prices_api = df_prices_api[df_prices_api['time_start'].isin(hours_missing)]
-
-    # Combine historical and API prices
-    df_prices = pd.concat([df_prices_hist, df_prices_api], ignore_index=True)
-    # Filter to requested range
-    df_prices = df_prices[df_prices['time_start'].isin(hours_needed)]
-    # Add UTC column for merging
-    df_prices['time_utc'] = df_prices['time_start'].dt.tz_convert('UTC')
-    #print("\n--- DEBUG: df_prices (price) ---")
-    #with pd.option_context('display.max_rows', 100, 'display.max_columns', None):
-    #    print(df_prices.head(100))
-
-    # --- End of price fetching logic ---
-    # Comments: Now loads prices from CSV for historical periods, only fetches missing hours from API. This reduces API calls and speeds up app.
-    
+        print('Could not load prices:', e)
+        return pd.Series([], index=pd.DatetimeIndex([], tz='Europe/Copenhagen'), dtype=float)
+
+
+def usage_hours(df_power: pd.DataFrame):
+    """Hour keys of `df_power` in time order and the order that sorts its rows."""
+    usage_keys = hour_keys(df_power['time'])
+    order = np.argsort(usage_keys, kind='stable')
+    return usage_keys[order], order
+
+
+def align_sources(df_power: pd.DataFrame, prices: pd.Series, tariff_series: pd.Series) -> pd.DataFrame:
+    """Put usage, spot prices, tariffs and afgift side by side on the usage hours.
+
+    Returns `time, usage_kwh, spot_pris, tarif_pris, afgift_pris` sorted by time.
+    """
+    usage_keys, order = usage_hours(df_power)
+    local = local_times(usage_keys)
+
+    # Gather prices and tariffs onto the usage hours by offset from the first hour (no merge)
+    spot, missing_spot = align(usage_keys, hour_keys(prices.index), prices.to_numpy(dtype=float))
+    tarif, missing_tarif = align(usage_keys, hour_keys(tariff_series.index), tariff_series.to_numpy(dtype=float), fill=0.0)
+    for name, missing in (('spot price', missing_spot), ('tariff', missing_tarif)):
+        if missing.any():
+            hours = np.unique(usage_keys[missing])
+            print(f'No {name} for {len(hours)} hour(s): {describe_hours(hours)}')
+
+    return pd.DataFrame({
+        'time': local,
+        'usage_kwh': df_power['usage_kwh'].to_numpy()[order],
+        'spot_pris': spot,
+        'tarif_pris': tarif,
+        # Afgift (tax) per kWh from the validity periods in afgift_manual.csv (see afgift.py)
+        'afgift_pris': load_afgift_schedule().rates(local),
+    })
+
+
+def fetch_raw_data(refresh_token=None, from_date=None, to_date=None):
+    """Fetch hourly power usage for a period and merge with prices, tariffs and afgift.
+
+    This is the network stage: it returns `time, usage_kwh, spot_pris, tarif_pris,
+    afgift_pris` and does not depend on the car settings, so it only needs to run
+    again when the token or period changes. See `compute_costs` for the rest.
+    If `refresh_token` is None, the function will read 'token.txt'.
+    All sources are aligned on int64 UTC epoch hours (hour_keys.py); local time
+    is only derived for the result.
+    """
+    from_date, to_date = resolve_period(from_date, to_date)
+    df_power = fetch_usage(refresh_token, from_date, to_date)
+    if df_power is None:
+        return None
+    prices = load_spot_prices(from_date, to_date)
+
     # Fetch tariff prices (build hourly series)
     print('Fetching tariff prices...')
-    start_ts = df_power['time'].min()
-    end_ts = df_power['time'].max()
-    tariff_series = fetch_tariff_data(access, points, start_ts, end_ts)
+    usage_keys, _ = usage_hours(df_power)
+    tariff_series = fetch_tariff_data(None, [], *local_times(usage_keys[[0, -1]]))
+    return align_sources(df_power, prices, tariff_series)
 
-    # Ensure both merge columns are datetime
-    df_power['time'] = pd.to_datetime(df_power['time'])
-    df_power['time'] = pd.to_datetime(df_power['time'])
-    try:
-        df_prices['time_start'] = pd.to_datetime(df_prices['time_start'])
-        df_prices['time_start'] = pd.to_datetime(df_prices['time_start'], utc=True)
-    except Exception as e:
-        print('Error converting df_prices["time_start"] to datetime:', e)
-        print('Problematic values:', df_prices['time_start'].head(10).to_list())
-        df_prices['time_start'] = pd.to_datetime(df_prices['time_start'], errors='coerce')
-        df_prices['time_start'] = pd.to_datetime(df_prices['time_start'], errors='coerce', utc=True)
-    # Merge power data with prices using UTC time to guarantee a match for every hour
-    #print("\n--- DEBUG: Merging on 'time_utc' ---")
-    df_merged = pd.merge(df_power, df_prices, left_on='time', right_on='time_start', how='left', suffixes=('', '_price'))
-    #print('the merged data looks like this:')
-    #with pd.option_context('display.max_rows', 100, 'display.max_columns', None):
-    #    print(df_merged.head(100))
-    #print('the merged tables looked like this:')
-   # print('df_power:')
-    #with pd.option_context('display.max_rows', 100, 'display.max_columns', None):
-     #   print(df_power.head(5))
-    #print('df_prices:')
-    #with pd.option_context('display.max_rows', 100, 'display.max_columns', None):
-    #    print(df_prices.head(5))
-    # After merge, drop time_utc columns and keep time in Europe/Copenhagen
-    df_merged = df_merged.drop(columns=['time_utc'])
-    if 'time_utc_price' in df_merged.columns:
-        df_merged = df_merged.drop(columns=['time_utc_price'])
-
-    # Add tariff column by aligning hourly tariff series
-    try:
-        tariff_series = tariff_series.tz_convert(ZoneInfo('Europe/Copenhagen'))
-    except Exception:
-        pass
-    df_merged = df_merged.sort_values('time')
-    df_merged['tariff_dkk_per_kwh'] = tariff_series.reindex(pd.DatetimeIndex(df_merged['time'])).fillna(0).values
-    # Load `afgift` (tax) per kWh from a CSV file if available, otherwise fall back to hardcoded defaults.
-    afgift_series = pd.Series(0.0, index=tariff_series.index)
-    try:
-        afg = pd.read_csv('afgift_manual.csv')
-        for _, row in afg.iterrows():
-            ys = int(row['year_start'])
-            ye = int(row['year_end'])
-            val = float(row['afgift_dkk_per_kwh'])
-            mask = (afgift_series.index.year >= ys) & (afgift_series.index.year <= ye)
-            afgift_series.loc[mask] = val
-    except Exception as e:
-        # Fallback to previous behavior if CSV missing or malformed
-        afgift_series.loc[[ts for ts in tariff_series.index if ts.year <= 2025]] = 0.9
-        afgift_series.loc[[ts for ts in tariff_series.index if ts.year >= 2026]] = 0.01
-
-    df_merged['afgift_dkk_per_kwh'] = afgift_series.reindex(pd.DatetimeIndex(df_merged['time'])).fillna(0).values
-
-    # Calculate costs
-    df_merged['spot_cost_dkk'] = df_merged['usage_kwh'] * df_merged['DKK_per_kWh']
-    df_merged['tariff_cost_dkk'] = df_merged['usage_kwh'] * df_merged['tariff_dkk_per_kwh']
-    df_merged['afgift_cost_dkk'] = df_merged['usage_kwh'] * df_merged['afgift_dkk_per_kwh']
-    df_merged['total_cost_dkk'] = df_merged['spot_cost_dkk'] + df_merged['tariff_cost_dkk'] + df_merged['afgift_cost_dkk']
-    df_merged['total_pris_per_kwh'] = df_merged['total_cost_dkk'] / df_merged['usage_kwh']
-    
-    # Select and order columns
-    df_result = df_merged[['time', 'usage_kwh', 'DKK_per_kWh', 'tariff_dkk_per_kwh', 'afgift_dkk_per_kwh', 'total_cost_dkk', 'total_pris_per_kwh']].copy()
-    df_result.columns = ['time', 'usage_kwh', 'spot_pris', 'tarif_pris', 'afgift_pris', 'total_udgift', 'total_pris_per_kwh']
-    df_result = df_result.sort_values('time').reset_index(drop=True)
-    # Detect car charging and allocate kWh based on thresholds provided test
-    try:
-        df_result['car_charging'] = df_result['usage_kwh'] >= float(charge_threshold)
-        df_result['car_kwh'] = 0.0
-        mask = df_result['car_charging']
-        if mask.any():
-            df_result.loc[mask, 'car_kwh'] = df_result.loc[mask, 'usage_kwh'].clip(upper=float(car_max_kwh))
-        df_result['house_kwh'] = df_result['usage_kwh'] - df_result['car_kwh']
-    except Exception:
-        # Fallback: ensure columns exist
-        if 'car_kwh' not in df_result.columns:
-            df_result['car_kwh'] = 0.0
-        if 'car_charging' not in df_result.columns:
-            df_result['car_charging'] = False
-        if 'house_kwh' not in df_result.columns:
-            df_result['house_kwh'] = df_result['usage_kwh']
-
-    #print(f'\nFetched {len(df_result)} hours of data from {from_date} to {to_date}\n')
-    #print(df_result.to_string(index=False))
-    total_usage = df_result['usage_kwh'].sum()
-    total_spot = (df_result['usage_kwh'] * df_result['spot_pris']).sum()
-    total_tarif = (df_result['usage_kwh'] * df_result['tarif_pris']).sum()
-    total_afgift = (df_result['usage_kwh'] * df_result['afgift_pris']).sum()
-    total_cost = df_result['total_udgift'].sum()
-
-    #print(f'\nTotal usage: {total_usage:.2f} kWh')
-    #print(f'Total spot cost: {total_spot:.2f} DKK')
-    #print(f'Total tariff cost: {total_tarif:.2f} DKK')
-    #print(f'Total afgift (tax): {total_afgift:.2f} DKK')
-    #print(f'Total cost (spot + tariff + afgift): {total_cost:.2f} DKK')
-
-    return df_result
+
+def compute_costs_with_totals(df_raw: pd.DataFrame, charge_threshold: float = 5.0, car_max_kwh: float = 11.0,
+                              detector: str = 'threshold'):
+    """Add cost columns and car/house split to the output of `fetch_raw_data`.
+
+    Pure and cheap, so it can be re-run (and memoized) on every threshold change
+    without touching the network. Charging hours are found by `detector` (see
+    detectors.py). Returns the hourly frame and the period totals from the same
+    pass (see cost_kernel.py).
+    """
+    df_result = df_raw[['time', 'usage_kwh', 'spot_pris', 'tarif_pris', 'afgift_pris']]
+    usage, spot, tarif, afgift = (df_result[c] for c in ['usage_kwh', 'spot_pris', 'tarif_pris', 'afgift_pris'])
+    total, price = cost_kernel.hourly_costs(usage, spot, tarif, afgift)
+    charging, car_kwh, house_kwh = detectors.detect(detector, usage, hour_keys(df_result['time']), df_result['time'].dt.hour.to_numpy(),
+                                                    charge_threshold, car_max_kwh)
+    totals = cost_kernel.period_totals(usage, spot, tarif, afgift, total, price, car_kwh, house_kwh)
+    return df_result.assign(total_udgift=total, total_pris_per_kwh=price, car_charging=charging,
+                            car_kwh=car_kwh, house_kwh=house_kwh), totals
+
+
+def compute_costs(df_raw: pd.DataFrame, charge_threshold: float = 5.0, car_max_kwh: float = 11.0,
+                  detector: str = 'threshold') -> pd.DataFrame:
+    """Like `compute_costs_with_totals`, without the totals."""
+    return compute_costs_with_totals(df_raw, charge_threshold, car_max_kwh, detector)[0]
+
+
+def fetch_power_data(refresh_token=None, charge_threshold: float = 5.0, car_max_kwh: float = 11.0, from_date=None, to_date=None,
+                     detector: str = 'threshold'):
+    """Fetch hourly power usage for a period and merge with prices (fetch + compute in one call)."""
+    df_raw = fetch_raw_data(refresh_token, from_date, to_date)
+    if df_raw is None:
+        return None
+    return compute_costs(df_raw, charge_threshold, car_max_kwh, detector)
 
 if __name__ == '__main__':
     df = fetch_power_data()
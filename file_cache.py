@@ -0,0 +1,62 @@
+"""Objects parsed from a data file, kept until the file changes on disk.
+
+The manual CSVs (tariffs, afgift, Clever rates) are read on nearly every
+rerun; a `FileCache` parses each path once and only rebuilds when its mtime
+changes, so editing a CSV takes effect without restarting the app.
+"""
+import os
+import threading
+
+
+class FileCache:
+    """`build(path)` per path, rebuilt only when the file's mtime changes.
+
+    Without `fallback`, errors from `os.stat` or `build` propagate. With it, a
+    missing or unreadable file prints a message and gives `fallback()`, which
+    is cached until the file appears or changes.
+    """
+
+    def __init__(self, build, fallback=None):
+        self.build = build
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        # path -> (mtime_ns or None, object)
+        self._cache = {}
+
+    def get(self, path: str):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            if self.fallback is None:
+                raise
+            mtime = None
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, self._load(path))
+                self._cache[path] = cached
+            return cached[1]
+
+    def version(self, path: str):
+        """The file's mtime (ns), or None if it is missing: it changes whenever `get(path)` would rebuild.
+
+        Cheap enough to use in cache keys for objects computed from the file.
+        """
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def put(self, path: str, value):
+        """Record `value` as the object for the file as it is now, e.g. right after writing it."""
+        with self._lock:
+            self._cache[path] = (os.stat(path).st_mtime_ns, value)
+
+    def _load(self, path: str):
+        if self.fallback is None:
+            return self.build(path)
+        try:
+            return self.build(path)
+        except Exception as e:
+            print(f'Could not read {path}:', e)
+            return self.fallback()
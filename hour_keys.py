@@ -0,0 +1,90 @@
+"""Hour keys: int64 UTC epoch hours used to align hourly sources.
+
+Usage, prices, tariffs and afgift are keyed on `hour_keys(...)` internally, so
+joining them is integer alignment and never depends on local wall-clock time.
+Local time is derived from the keys only for display (`local_times`), which
+keeps both 02:00 hours of the October fall-back and skips the missing March
+hour instead of dropping or duplicating them.
+"""
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+LOCAL_TZ = 'Europe/Copenhagen'
+SECONDS_PER_HOUR = 3600
+
+
+def hour_keys(times) -> np.ndarray:
+    """UTC epoch hours of `times` (floored to the hour); naive times are local."""
+    index = pd.DatetimeIndex(times)
+    if index.tz is None:
+        index = index.tz_localize(LOCAL_TZ, ambiguous='infer', nonexistent='shift_forward')
+    return index.as_unit('s').asi8 // SECONDS_PER_HOUR
+
+
+def local_times(keys, tz: str = LOCAL_TZ) -> pd.DatetimeIndex:
+    """Tz-aware local start times of the hours `keys`."""
+    seconds = np.asarray(keys, dtype=np.int64) * SECONDS_PER_HOUR
+    return pd.DatetimeIndex(seconds.astype('datetime64[s]')).tz_localize('UTC').tz_convert(tz)
+
+
+def as_date(d):
+    """`d` (a date, timestamp or date string) as a `datetime.date`; None stays None."""
+    # datetime (and so pd.Timestamp) is a subclass of date, so it is checked first
+    if isinstance(d, datetime):
+        return d.date()
+    if d is None or isinstance(d, date):
+        return d
+    return pd.Timestamp(d).date()
+
+
+def day_start_key(d) -> int:
+    """Hour key of local midnight starting the date `d`."""
+    d = as_date(d)
+    return int(hour_keys(pd.DatetimeIndex([pd.Timestamp(d)]))[0])
+
+
+def day_range(from_date, to_date) -> np.ndarray:
+    """Keys of every hour from local midnight of `from_date` up to (not incl.) local midnight of `to_date`."""
+    return np.arange(day_start_key(from_date), day_start_key(to_date), dtype=np.int64)
+
+
+def align(keys, source_keys, values, fill=np.nan):
+    """Gather `values` (one per `source_keys`) onto the hours `keys`.
+
+    Each hour maps to its offset from the smallest key in `keys`; the source is
+    scattered into a preallocated array over that span once and read back with
+    one gather, so no hashing or sorting is involved. Returns `(aligned,
+    missing)` where `missing` marks the hours the source has no value for
+    (those get `fill`). Later duplicates in the source win.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    source_keys = np.asarray(source_keys, dtype=np.int64)
+    values = np.asarray(values)
+    if len(keys) == 0:
+        return np.full(0, fill, dtype=np.result_type(values, type(fill))), np.zeros(0, dtype=bool)
+    base = keys.min()
+    span = int(keys.max() - base) + 1
+    table = np.full(span, fill, dtype=np.result_type(values, type(fill)))
+    present = np.zeros(span, dtype=bool)
+    offsets = source_keys - base
+    inside = (offsets >= 0) & (offsets < span)
+    table[offsets[inside]] = values[inside]
+    present[offsets[inside]] = True
+    offsets = keys - base
+    return table[offsets], ~present[offsets]
+
+
+def describe_hours(keys, limit: int = 5) -> str:
+    """Short text of the runs of consecutive hours in `keys`, e.g. for log messages."""
+    keys = np.unique(np.asarray(keys, dtype=np.int64))
+    if len(keys) == 0:
+        return 'none'
+    breaks = np.flatnonzero(np.diff(keys) != 1) + 1
+    starts, ends = keys[np.r_[0, breaks]], keys[np.r_[breaks, len(keys)] - 1]
+    fmt = '%Y-%m-%d %H:%M'
+    runs = [a.strftime(fmt) if s == e else f'{a.strftime(fmt)} to {b.strftime(fmt)}'
+            for s, e, a, b in zip(starts[:limit], ends[:limit], local_times(starts[:limit]), local_times(ends[:limit]))]
+    more = f' (+{len(starts) - limit} more)' if len(starts) > limit else ''
+    return ', '.join(runs) + more
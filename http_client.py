@@ -0,0 +1,51 @@
+"""Shared HTTP session with connection pooling and retry/backoff helpers."""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying; anything else (e.g. 404 for a day without prices) fails fast
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def make_session(pool_size: int = 8) -> requests.Session:
+    """Create a `requests.Session` whose connection pool fits `pool_size` concurrent workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process-wide session so keep-alive connections are reused across calls and users."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session(pool_size=16)
+        return _session
+
+
+def request_with_retry(session, method, url, retries=3, backoff=0.5, timeout=20, **kwargs):
+    """Send a request and retry transient failures with exponential backoff.
+
+    Returns `(response, attempts)`. The final response is returned even when its
+    status is an error, so the caller decides how to handle it. Connection errors
+    on the last attempt are re-raised.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt > retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUS or attempt > retries:
+                return response, attempt
+        time.sleep(backoff * (2 ** (attempt - 1)))
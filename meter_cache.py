@@ -0,0 +1,146 @@
+"""Persistent cache of hourly meter data keyed by (owner, meteringPointId, hour).
+
+Consumption is stored in a SQLite file outside the repository
+(`$ELBIL_CACHE_DIR`, default `~/.cache/elbil_beregner`) that only the current
+user can read. Rows belong to the refresh token that downloaded them (`owner`
+is `eloverblik.token_key`, a SHA-256 of the token): a metering point stays
+with the address when people move, so a new occupant only ever sees hours
+their own token has fetched. `fetch_with_cache` reads what is cached for a period and only
+asks Eloverblik for the days of each point that are missing or incomplete, so
+widening the period by a day downloads a day, and a repeat visit downloads nothing.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import eloverblik
+from hour_keys import as_date, day_start_key, hour_keys, local_times
+
+CACHE_DIR = os.environ.get('ELBIL_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'elbil_beregner'))
+DB_FILE = 'meter_data.sqlite'
+# Stored in the file's `PRAGMA user_version`; 1 = rows keyed by owner
+SCHEMA_VERSION = 1
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _db():
+    """Serialised connection that commits on success and is always closed."""
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+    path = os.path.join(CACHE_DIR, DB_FILE)
+    is_new = not os.path.exists(path)
+    conn = sqlite3.connect(path, timeout=30)
+    if is_new:
+        os.chmod(path, 0o600)
+    conn.execute('PRAGMA journal_mode=WAL')
+    if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+        _migrate(conn)
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Bring the cache file up to `SCHEMA_VERSION`; runs once per file."""
+    with conn:
+        # Version 0 shared rows between all tokens; those can't be attributed to an owner
+        conn.execute('DROP TABLE IF EXISTS meter_hours')
+        conn.execute('CREATE TABLE IF NOT EXISTS owner_meter_hours ('
+                     'owner TEXT NOT NULL, metering_point_id TEXT NOT NULL, hour INTEGER NOT NULL, kwh REAL NOT NULL, '
+                     'PRIMARY KEY (owner, metering_point_id, hour)) WITHOUT ROWID')
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+
+def store(owner: str, df: pd.DataFrame):
+    """Insert or update `owner`'s `meteringPointId, time, usage_kwh` rows."""
+    if df is None or df.empty:
+        return
+    hours = hour_keys(df['time'])
+    rows = zip([owner] * len(df), df['meteringPointId'].astype(str), hours.tolist(), df['usage_kwh'].astype(float).tolist())
+    with _db() as conn:
+        conn.executemany('INSERT OR REPLACE INTO owner_meter_hours VALUES (?, ?, ?, ?)', rows)
+
+
+def load(owner: str, points, from_date, to_date) -> pd.DataFrame:
+    """`owner`'s cached rows for `points` from local midnight of `from_date` up to (not incl.) `to_date`."""
+    points = [str(p) for p in points]
+    lo, hi = day_start_key(as_date(from_date)), day_start_key(as_date(to_date))
+    if not points:
+        rows = []
+    else:
+        marks = ','.join('?' * len(points))
+        with _db() as conn:
+            rows = conn.execute(f'SELECT metering_point_id, hour, kwh FROM owner_meter_hours '
+                                f'WHERE owner = ? AND metering_point_id IN ({marks}) AND hour >= ? AND hour < ? '
+                                f'ORDER BY metering_point_id, hour', [owner, *points, lo, hi]).fetchall()
+    ids = np.array([r[0] for r in rows], dtype=object)
+    hours = np.array([r[1] for r in rows], dtype=np.int64)
+    kwh = np.array([r[2] for r in rows], dtype=np.float64)
+    return pd.DataFrame({
+        'meteringPointId': ids,
+        'time': local_times(hours),
+        'usage_kwh': kwh,
+    })
+
+
+def missing_ranges(cached: pd.DataFrame, point, from_date, to_date) -> list:
+    """`(start, end)` date windows (end exclusive) of days not fully cached for `point`."""
+    from_date, to_date = as_date(from_date), as_date(to_date)
+    days = [from_date + timedelta(days=n) for n in range((to_date - from_date).days)]
+    if not days:
+        return []
+    bounds = np.array([day_start_key(d) for d in days + [to_date]], dtype=np.int64)
+    expected = np.diff(bounds)
+    have = np.zeros(len(days), dtype=np.int64)
+    rows = cached[cached['meteringPointId'] == str(point)]
+    if not rows.empty:
+        hours = hour_keys(rows['time'])
+        have = np.bincount(np.searchsorted(bounds, hours, side='right') - 1, minlength=len(days))[:len(days)]
+    ranges = []
+    for d, complete in zip(days, have >= expected):
+        if complete:
+            continue
+        if ranges and ranges[-1][1] == d:
+            ranges[-1][1] = d + timedelta(days=1)
+        else:
+            ranges.append([d, d + timedelta(days=1)])
+    return [tuple(r) for r in ranges]
+
+
+def fetch_with_cache(access, points, from_date, to_date, owner: str) -> pd.DataFrame:
+    """Like `eloverblik.fetch_timeseries`, but only downloads hours `owner` hasn't cached yet."""
+    points = [str(p) for p in points]
+    cached = load(owner, points, from_date, to_date)
+    # Points with identical gaps are fetched together so they share requests
+    gaps = {}
+    for point in points:
+        for window in missing_ranges(cached, point, from_date, to_date):
+            gaps.setdefault(window, []).append(point)
+    fetched = []
+    for (start, end), batch in sorted(gaps.items()):
+        df = eloverblik.fetch_timeseries(access, batch, start, end)
+        store(owner, df)
+        fetched.append(df)
+    if not fetched:
+        return cached
+    print(f'Fetched {sum(len(df) for df in fetched)} new hour(s) of meter data, {len(cached)} from cache')
+    df = pd.concat([cached, *fetched], ignore_index=True)
+    df = df.drop_duplicates(subset=['meteringPointId', 'time'], keep='last')
+    # Keep the same period a pure cache hit would return
+    hours = hour_keys(df['time'])
+    df = df[(hours >= day_start_key(as_date(from_date))) & (hours < day_start_key(as_date(to_date)))]
+    return df.sort_values(['meteringPointId', 'time'], kind='stable').reset_index(drop=True)
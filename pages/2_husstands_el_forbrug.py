@@ -4,60 +4,42 @@ st.set_page_config(page_title="Hustands elforbrug og priser", layout="wide")
 st.title("Hustandens elforbrug og priser – Bedre indblik i dit elforbrug🔋")
 
 # Import tab modules
+from tabs import charts_tab, daily_summary_tab, data_table_tab, hourly_stats_tab
 from tabs.daily_summary_tab import render as render_daily_summary_tab
 from tabs.data_table_tab import render as render_data_table_tab
 from tabs.hourly_stats_tab import render as render_hourly_stats_tab
 from tabs.charts_tab import render as render_charts_tab
 
-import pandas as pd
+from data_views import column_view, filter_by_view_range
+import pipeline
 
 st.page_link("app.py", label="Til Forside", icon="⚡️")
 st.page_link("pages/1_elbil_opladning.py", label="Gå til elbil opladning analyse", icon="🚗")
 
 
-def _filter_df_by_view_range(df, view_range):
-	try:
-		if isinstance(view_range, tuple) and len(view_range) == 2:
-			vf_from, vf_to = view_range
-		else:
-			vf_from = view_range
-			vf_to = view_range
-		if vf_from is None and vf_to is None:
-			return df
-		if vf_from is not None and not isinstance(vf_from, pd.Timestamp):
-			vf_from = pd.to_datetime(vf_from)
-		if vf_to is not None and not isinstance(vf_to, pd.Timestamp):
-			vf_to = pd.to_datetime(vf_to)
-		if vf_from is None:
-			vf_from = df['time'].min()
-		if vf_to is None:
-			vf_to = df['time'].max()
-		if vf_from > vf_to:
-			vf_from, vf_to = vf_to, vf_from
-		return df[(df['time'] >= vf_from) & (df['time'] <= vf_to)].copy()
-	except Exception:
-		return df
-
 if 'df_data' in st.session_state and not st.session_state['df_data'].empty:
 	df = st.session_state['df_data']
-	from_date = df['time'].dt.date.min()
-	to_date = df['time'].dt.date.max()
+	# Shared rollups, computed once per dataset and reused by the summary and all tabs
+	rollups = pipeline.rollups(pipeline.get_pipeline(), df, st.session_state.get('df_key'), st.session_state.get('cost_totals'))
+	totals = rollups['totals']
+	from_date = totals['first_date']
+	to_date = totals['last_date']
 
 
 	# --- Rule-based summary block ---
-	total_usage = df['usage_kwh'].sum()
-	total_cost = df['total_udgift'].sum() if 'total_udgift' in df.columns else (df['usage_kwh'] * df['total_pris_per_kwh']).sum()
-	avg_price = (df['total_pris_per_kwh'].mean() if 'total_pris_per_kwh' in df.columns else None)
-	peak_price = df['spot_pris'].max() if 'spot_pris' in df.columns else None
+	total_usage = totals['usage_kwh']
+	total_cost = totals['total_udgift']
+	avg_price = (totals['avg_price'] if 'total_pris_per_kwh' in df.columns else None)
+	peak_price = totals['peak_spot'] if 'spot_pris' in df.columns else None
 	# Calculate period in months
 	n_months = max(1, ((to_date.year - from_date.year) * 12 + (to_date.month - from_date.month) + 1))
 	# Monthly averages
 	monthly_usage = total_usage / n_months
 	# Car and house usage/costs
-	car_kwh = df['car_kwh'].sum() if 'car_kwh' in df.columns else 0.0
-	house_kwh = df['house_kwh'].sum() if 'house_kwh' in df.columns else (total_usage - car_kwh)
-	car_cost = (df['car_kwh'] * df['total_pris_per_kwh']).sum() if 'car_kwh' in df.columns else 0.0
-	house_cost = (df['house_kwh'] * df['total_pris_per_kwh']).sum() if 'house_kwh' in df.columns else (total_cost - car_cost)
+	car_kwh = totals['car_kwh']
+	house_kwh = totals['house_kwh']
+	car_cost = totals['car_cost']
+	house_cost = totals['house_cost']
 	avg_house_price = (house_cost / house_kwh) if house_kwh > 0 else 0.0
 	avg_car_price = (car_cost / car_kwh) if car_kwh > 0 else 0.0
 	monthly_car_kwh = car_kwh / n_months
@@ -79,15 +61,15 @@ if 'df_data' in st.session_state and not st.session_state['df_data'].empty:
 	# --- End rule-based summary block ---
 
 	st.markdown("### Månedlige omkostninger og spotpris tendenser")
-	render_charts_tab(df, from_date, to_date, _filter_df_by_view_range)
+	render_charts_tab(column_view(df, charts_tab.COLUMNS), from_date, to_date, filter_by_view_range, rollups)
 	st.divider()
 	st.markdown("### Daglig opsummering af forbrug og udgifter")
-	render_daily_summary_tab(df, from_date, to_date, _filter_df_by_view_range)
+	render_daily_summary_tab(column_view(df, daily_summary_tab.COLUMNS), from_date, to_date, filter_by_view_range, rollups)
 	st.divider()
 	st.markdown("### Timebaserede statistikker og forbrugsmønstre")
-	render_hourly_stats_tab(df, from_date, to_date, _filter_df_by_view_range)
+	render_hourly_stats_tab(column_view(df, hourly_stats_tab.COLUMNS), from_date, to_date, filter_by_view_range, rollups)
 	st.markdown("### Data Deep dive - se dit forbrug og priser time for time")
-	render_data_table_tab(df, from_date, to_date, _filter_df_by_view_range)
+	render_data_table_tab(column_view(df, data_table_tab.COLUMNS), from_date, to_date, filter_by_view_range)
 	st.divider()
 else:
 	st.warning("Ingen data fundet. Gå til forsiden og hent data først.")
@@ -0,0 +1,202 @@
+"""Session-scoped, memoised computation graph behind the app and its pages.
+
+The app's data flows through a handful of nodes:
+
+    usage, prices -> tariffs -> raw -> costs -----------\
+                                   \-> hours -> car -------> dataset -> rollups -> clever_months -> clever_comparison
+                                                                \-> sessions
+
+Every node is a pure function of its inputs and is keyed by a token: a hash of
+the node's name and the tokens or values of its inputs. A node only runs when
+its token has not been seen recently, so a rerun pays only for the nodes
+downstream of the parameter that actually changed, e.g. a new
+`udeladning_pris` recomputes `clever_comparison` and nothing else. Fetched
+data (usage, prices and the raw frame held in the session) enter as source
+nodes keyed by their content, which keeps every token below them
+content-addressed and usable as a key for other caches (figures, exports).
+
+One `Pipeline` lives in `st.session_state['pipeline']`; each node keeps its
+last few results so switching a setting back and forth is free.
+"""
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from afgift import afgift_schedule_version
+import clever
+from charge_sessions import session_table
+import cost_kernel
+import detectors
+from fetch_power_data import align_sources, fetch_tariff_data, fetch_usage, load_spot_prices, resolve_period, usage_hours
+from hour_keys import hour_keys, local_times
+from rollups import build_rollups, dataset_key
+from tariffs import tariff_table_version
+
+MAX_ENTRIES = 4
+
+RAW_COLUMNS = ['time', 'usage_kwh', 'spot_pris', 'tarif_pris', 'afgift_pris']
+
+
+def _digest(value) -> str:
+    if isinstance(value, np.ndarray):
+        return hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest() + str((value.dtype, value.shape))
+    return repr(value)
+
+
+class Pipeline:
+    """Per-node memo of `{token: value}`, least recently used first."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._values = {}
+        self._sources = {}
+        # name -> token of the node's latest result
+        self.tokens = {}
+
+    def token(self, name: str, inputs: tuple) -> str:
+        text = '|'.join([name] + [_digest(v) for v in inputs])
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def node(self, name: str, inputs: tuple, compute, *args):
+        """`(token, compute(*args))`, memoised on `inputs` (tokens of upstream nodes and plain parameters)."""
+        token = self.token(name, inputs)
+        values = self._values.setdefault(name, OrderedDict())
+        if token in values:
+            values.move_to_end(token)
+        else:
+            values[token] = compute(*args)
+            while len(values) > self.max_entries:
+                values.popitem(last=False)
+        self.tokens[name] = token
+        return token, values[token]
+
+    def source(self, name: str, value: pd.DataFrame) -> str:
+        """Token of an externally produced frame (fetched data): its content hash, computed once per object."""
+        cached = self._sources.get(name)
+        if cached is None or cached[0] is not value:
+            cached = (value, dataset_key(value))
+            self._sources[name] = cached
+        self.tokens[name] = cached[1]
+        return cached[1]
+
+    def invalidate(self, *names: str):
+        """Forget the memoised results of `names`, so they run again on next use."""
+        for name in names:
+            self._values.pop(name, None)
+            self._sources.pop(name, None)
+            self.tokens.pop(name, None)
+
+
+def get_pipeline() -> Pipeline:
+    """The current session's pipeline."""
+    return st.session_state.setdefault('pipeline', Pipeline())
+
+
+# --- Fetch stage ---
+
+def fetch_raw(pipe: Pipeline, refresh_token, from_date=None, to_date=None):
+    """Usage, prices and tariffs aligned into the raw frame (see `fetch_power_data.fetch_raw_data`), or None.
+
+    Usage and prices are fetched again on every call, since the meter and price
+    caches already skip what is stored, and are keyed by their content: a
+    refetch that fills a gap gives a new raw frame, one that returns the same
+    hours reuses it. The tariff series is reused while the hours it covers
+    stay the same and the tariff CSV is unchanged; the raw frame is also
+    rebuilt when the afgift CSV changes.
+    """
+    from_date, to_date = resolve_period(from_date, to_date)
+    df_power = fetch_usage(refresh_token, from_date, to_date)
+    if df_power is None:
+        return None
+    usage_token = pipe.source('usage', df_power)
+    prices = load_spot_prices(from_date, to_date)
+    prices_token = pipe.source('prices', prices.to_frame().reset_index())
+
+    print('Fetching tariff prices...')
+    usage_keys, _ = usage_hours(df_power)
+    first, last = int(usage_keys[0]), int(usage_keys[-1])
+    tariffs_token, tariff_series = pipe.node('tariffs', (first, last, tariff_table_version()),
+                                             fetch_tariff_data, None, [], *local_times([first, last]))
+    _, df_raw = pipe.node('raw', (usage_token, prices_token, tariffs_token, afgift_schedule_version()),
+                          align_sources, df_power, prices, tariff_series)
+    return df_raw
+
+
+# --- Compute stage ---
+
+def _costs(df_raw: pd.DataFrame) -> dict:
+    total, price = cost_kernel.hourly_costs(df_raw['usage_kwh'], df_raw['spot_pris'], df_raw['tarif_pris'], df_raw['afgift_pris'])
+    return {'total_udgift': total, 'total_pris_per_kwh': price}
+
+
+def _hours(df_raw: pd.DataFrame):
+    return hour_keys(df_raw['time']), df_raw['time'].dt.hour.to_numpy()
+
+
+def _car(df_raw: pd.DataFrame, hours, detector: str, charge_threshold: float, car_max_kwh: float) -> dict:
+    charging, car_kwh, house_kwh = detectors.detect(detector, df_raw['usage_kwh'], *hours, charge_threshold, car_max_kwh)
+    return {'car_charging': charging, 'car_kwh': car_kwh, 'house_kwh': house_kwh}
+
+
+def _dataset(df_raw: pd.DataFrame, costs: dict, car: dict):
+    df = df_raw[RAW_COLUMNS].assign(**costs, **car)
+    totals = cost_kernel.period_totals(df['usage_kwh'], df['spot_pris'], df['tarif_pris'], df['afgift_pris'],
+                                       costs['total_udgift'], costs['total_pris_per_kwh'], car['car_kwh'], car['house_kwh'])
+    return df, totals
+
+
+def dataset(pipe: Pipeline, df_raw: pd.DataFrame, charge_threshold: float, car_max_kwh: float,
+            detector: str = 'threshold'):
+    """`(key, df, totals)`: the hourly cost frame for the car settings and its period totals.
+
+    Equivalent to `fetch_power_data.compute_costs_with_totals`. The costs only
+    depend on the raw frame and are kept across changes to the car settings or
+    `detector` (see detectors.py). `key` is content-addressed and can be used
+    as the dataset's cache key.
+    """
+    raw_token = pipe.source('raw', df_raw)
+    costs_token, costs = pipe.node('costs', (raw_token,), _costs, df_raw)
+    hours_token, hours = pipe.node('hours', (raw_token,), _hours, df_raw)
+    car_token, car = pipe.node('car', (hours_token, detector, float(charge_threshold), float(car_max_kwh)), _car,
+                               df_raw, hours, detector, charge_threshold, car_max_kwh)
+    key, (df, totals) = pipe.node('dataset', (costs_token, car_token), _dataset, df_raw, costs, car)
+    return key, df, totals
+
+
+def rollups(pipe: Pipeline, df: pd.DataFrame, key: str = None, totals: dict = None) -> dict:
+    """`build_rollups(df, totals)` for the dataset `key` (hashed from `df` if not given)."""
+    return pipe.node('rollups', (key or dataset_key(df),), build_rollups, df, totals)[1]
+
+
+def charge_sessions(pipe: Pipeline, df: pd.DataFrame, key: str = None) -> pd.DataFrame:
+    """`charge_sessions.session_table(df)` for the dataset `key` (hashed from `df` if not given)."""
+    return pipe.node('sessions', (key or dataset_key(df),), session_table, df)[1]
+
+
+# --- Clever reconciliation ---
+
+def clever_months(pipe: Pipeline, keys, auto_kwh, total_price, clever_kwh):
+    """`(token, columns)` of `clever.reconcile_months`; unaffected by udeladning, recomputed when the rate CSV changes."""
+    keys = np.asarray(keys, dtype=np.int64)
+    auto_kwh, total_price, clever_kwh = (np.asarray(v, dtype=np.float64) for v in (auto_kwh, total_price, clever_kwh))
+    # Version before rates: if the CSV changes in between, the next call sees a new version and recomputes
+    version = clever.clever_rates_version()
+    rates = clever.load_clever_rates()
+    return pipe.node('clever_months', (keys, auto_kwh, total_price, clever_kwh, version),
+                     clever.reconcile_months, keys, auto_kwh, total_price, clever_kwh, rates)
+
+
+def clever_comparison(pipe: Pipeline, months_token: str, keys, months: dict, clever_kwh, udeladning_kwh, udeladning_pris: float):
+    """Columns of `clever.compare_without_clever` on top of the `clever_months` result `months_token`."""
+    udeladning_kwh = np.asarray(udeladning_kwh, dtype=np.float64)
+    return pipe.node('clever_comparison', (months_token, udeladning_kwh, float(udeladning_pris)),
+                     clever.compare_without_clever, keys, months['adjusted_total'], clever_kwh, udeladning_kwh, udeladning_pris)[1]
+
+
+def reconcile(pipe: Pipeline, keys, auto_kwh, total_price, clever_kwh, udeladning_kwh, udeladning_pris: float) -> dict:
+    """Memoised `clever.reconcile`: the Clever and without-Clever columns are separate nodes."""
+    months_token, months = clever_months(pipe, keys, auto_kwh, total_price, clever_kwh)
+    return {**months, **clever_comparison(pipe, months_token, keys, months, clever_kwh, udeladning_kwh, udeladning_pris)}
@@ -0,0 +1,73 @@
+"""Client for the Elprisenligenu spot price API (https://www.elprisenligenu.dk/elpris-api)."""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+
+from http_client import get_session, request_with_retry
+
+PRICE_API_URL = 'https://www.elprisenligenu.dk/api/v1/prices/{date_str}_{zone}.json'
+
+
+@dataclass
+class PriceDayResult:
+    """Outcome of fetching one day of spot prices."""
+    day: date
+    data: Optional[pd.DataFrame]
+    attempts: int
+    error: Optional[str] = None
+
+
+def _fetch_price_day(session, day: date, zone: str, retries: int, backoff: float) -> PriceDayResult:
+    date_str = day.strftime("%Y/%m-%d")
+    url = PRICE_API_URL.format(date_str=date_str, zone=zone)
+    attempts = 0
+    try:
+        response, attempts = request_with_retry(session, 'GET', url, retries=retries, backoff=backoff)
+        response.raise_for_status()
+        df = pd.DataFrame(response.json())[['time_start', 'DKK_per_kWh']]
+        # Parse as UTC, then convert to Europe/Copenhagen (local time with DST)
+        df['time_start_original'] = df['time_start']  # Keep original for debugging
+        df['time_start'] = pd.to_datetime(df['time_start'], utc=True)
+        df['time_start'] = df['time_start'].dt.tz_convert('Europe/Copenhagen')
+        # Add time_end column (1 hour after time_start)
+        df['time_end'] = df['time_start'] + pd.Timedelta(hours=1)
+        return PriceDayResult(day, df, attempts)
+    except Exception as e:
+        return PriceDayResult(day, None, max(attempts, 1), str(e))
+
+
+def fetch_el_price_days(days, zone: str = "DK2", max_workers: int = 8, retries: int = 3, backoff: float = 0.5) -> list:
+    """Fetch spot prices for each date in `days` concurrently over one pooled session.
+
+    Returns one `PriceDayResult` per day, in the same order as `days`, so callers can
+    see which days failed and how many attempts each took.
+    """
+    days = list(days)
+    if not days:
+        return []
+    session = get_session()
+    if max_workers <= 1 or len(days) == 1:
+        return [_fetch_price_day(session, d, zone, retries, backoff) for d in days]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(days))) as pool:
+        # map() yields results in submission order, so days come back sorted
+        return list(pool.map(lambda d: _fetch_price_day(session, d, zone, retries, backoff), days))
+
+
+def fetch_el_price_range(start_date: str, end_date: str, zone: str = "DK2", max_workers: int = 8) -> pd.DataFrame:
+    """Fetch hourly electricity prices from Elprisenligenu API."""
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+    results = fetch_el_price_days(days, zone=zone, max_workers=max_workers)
+    report_failed_days(results)
+    all_data = [r.data for r in results if r.data is not None]
+    return pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
+
+
+def report_failed_days(results):
+    failed = [r for r in results if r.error]
+    for r in failed:
+        print(f"Failed for {r.day:%Y/%m-%d} after {r.attempts} attempt(s): {r.error}")
@@ -0,0 +1,133 @@
+"""Self-filling spot price cache on top of `price_store`.
+
+`get_prices` reads stored hours for a date range and only asks the price API
+for days that have never been fetched. Every complete day fetched is appended
+to the store and recorded in `price_store/<zone>/coverage.json` (a list of
+covered local-date ranges), so no later request re-downloads the same hours.
+"""
+import json
+import os
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+
+import price_store
+from file_cache import FileCache
+from hour_keys import LOCAL_TZ
+from price_api import fetch_el_price_days, report_failed_days
+
+MOMS = 1.25
+
+_fill_lock = threading.Lock()
+
+
+def _coverage_path(zone: str) -> str:
+    return os.path.join(price_store.STORE_DIR, zone, 'coverage.json')
+
+
+def _to_ranges(days) -> list:
+    """Collapse dates into sorted, contiguous `[first, last]` ISO date ranges."""
+    ranges = []
+    for d in sorted(days):
+        if ranges and d - ranges[-1][1] == timedelta(days=1):
+            ranges[-1][1] = d
+        else:
+            ranges.append([d, d])
+    return [[a.isoformat(), b.isoformat()] for a, b in ranges]
+
+
+def _from_ranges(ranges) -> set:
+    days = set()
+    for a, b in ranges:
+        first, last = date.fromisoformat(a), date.fromisoformat(b)
+        days.update(first + timedelta(days=n) for n in range((last - first).days + 1))
+    return days
+
+
+def _hours_in_day(day: date) -> int:
+    start = pd.Timestamp(day).tz_localize(LOCAL_TZ)
+    end = pd.Timestamp(day + timedelta(days=1)).tz_localize(LOCAL_TZ)
+    return int((end - start) / pd.Timedelta(hours=1))
+
+
+def _write_coverage(zone: str, days: set):
+    path = _coverage_path(zone)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'ranges': _to_ranges(days)}, f)
+    os.replace(tmp, path)
+    _coverage.put(path, set(days))
+
+
+def _read_coverage(path: str) -> set:
+    with open(path) as f:
+        return _from_ranges(json.load(f).get('ranges', []))
+
+
+# coverage.json path -> set of covered dates
+_coverage = FileCache(_read_coverage)
+
+
+def _bootstrap_coverage(zone: str) -> set:
+    """Derive coverage from complete days already in the store (e.g. the CSV seed)."""
+    years = price_store.stored_years(zone)
+    days = set()
+    if years:
+        s = price_store.load_prices(pd.Timestamp(f'{years[0]}-01-01', tz='UTC'),
+                                    pd.Timestamp(f'{years[-1] + 1}-01-01', tz='UTC'), zone=zone)
+        counts = s.groupby(s.index.date).size()
+        days = {d for d, n in counts.items() if n >= _hours_in_day(d)}
+    _write_coverage(zone, days)
+    return days
+
+
+def covered_days(zone: str = 'DK2') -> set:
+    """Local dates whose prices are fully stored for `zone`."""
+    price_store.ensure_seeded(zone)
+    try:
+        return _coverage.get(_coverage_path(zone))
+    except FileNotFoundError:
+        return set(_bootstrap_coverage(zone))
+
+
+def missing_days(from_date: date, to_date: date, zone: str = 'DK2') -> list:
+    """Dates in `from_date..to_date` (inclusive) that have not been fetched yet."""
+    covered = covered_days(zone)
+    n = (to_date - from_date).days + 1
+    return [d for d in (from_date + timedelta(days=i) for i in range(max(n, 0))) if d not in covered]
+
+
+def fill(from_date: date, to_date: date, zone: str = 'DK2', max_workers: int = 8) -> int:
+    """Fetch and persist every uncovered day in the range; returns the number of new hours."""
+    with _fill_lock:
+        missing = missing_days(from_date, to_date, zone)
+        if not missing:
+            return 0
+        print(f'Fetching {len(missing)} missing day(s) of prices from API...')
+        results = fetch_el_price_days(missing, zone=zone, max_workers=max_workers)
+        report_failed_days(results)
+        fetched = [r for r in results if r.data is not None and not r.data.empty]
+        if not fetched:
+            return 0
+        df = pd.concat([r.data for r in fetched], ignore_index=True)
+        added = price_store.write_prices(df['time_start'], df['DKK_per_kWh'].to_numpy() * MOMS, zone=zone)
+        # Only complete days count as covered; partial ones (e.g. tomorrow before
+        # publication) are retried on the next request
+        complete = {r.day for r in fetched if len(r.data) >= _hours_in_day(r.day)}
+        if complete:
+            _write_coverage(zone, covered_days(zone) | complete)
+        return added
+
+
+def get_prices(from_date: date, to_date: date, zone: str = 'DK2', max_workers: int = 8) -> pd.Series:
+    """Hourly prices incl. moms for every hour of the local dates `from_date..to_date`.
+
+    Missing days are fetched from the API and stored first. Returns the same
+    Series shape as `price_store.load_prices`.
+    """
+    fill(from_date, to_date, zone=zone, max_workers=max_workers)
+    start = pd.Timestamp(from_date).tz_localize(LOCAL_TZ)
+    end = pd.Timestamp(to_date + timedelta(days=1)).tz_localize(LOCAL_TZ) - pd.Timedelta(seconds=1)
+    return price_store.load_prices(start, end, zone=zone)
@@ -0,0 +1,172 @@
+"""Columnar on-disk store for hourly spot prices.
+
+Prices are kept per zone and per UTC year as two memory-mapped NumPy arrays:
+`price_store/<zone>/<year>_time.npy` (int64 UTC epoch seconds, sorted) and
+`price_store/<zone>/<year>_price.npy` (float32 DKK/kWh incl. moms). Reading a
+date range only touches the years it spans and slices them with `searchsorted`,
+so no timestamp parsing happens per request.
+
+The store is seeded once from `historic_el_prices.csv` the first time a zone is read.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from hour_keys import LOCAL_TZ
+
+STORE_DIR = 'price_store'
+SEED_CSV = 'historic_el_prices.csv'
+
+# Guards the partition files and `_partitions`; reentrant because writers read the partition first
+_lock = threading.RLock()
+# (zone, year) -> ((time mtime_ns, price mtime_ns), times, prices); invalidated when either file changes
+_partitions = {}
+
+
+def _zone_dir(zone: str) -> str:
+    return os.path.join(STORE_DIR, zone)
+
+
+def _paths(zone: str, year: int):
+    base = os.path.join(_zone_dir(zone), str(year))
+    return base + '_time.npy', base + '_price.npy'
+
+
+def _to_epoch_seconds(ts) -> int:
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(LOCAL_TZ)
+    return int(ts.tz_convert('UTC').timestamp())
+
+
+def _utc_years(times: np.ndarray) -> np.ndarray:
+    return times.astype('datetime64[s]').astype('datetime64[Y]').astype(np.int64) + 1970
+
+
+def _read_partition(zone: str, year: int):
+    """`(times, prices)` of one partition as a matching pair, or None if it doesn't exist."""
+    time_path, price_path = _paths(zone, year)
+    with _lock:
+        try:
+            mtime = (os.stat(time_path).st_mtime_ns, os.stat(price_path).st_mtime_ns)
+        except FileNotFoundError:
+            return None
+        cached = _partitions.get((zone, year))
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+        times = np.load(time_path, mmap_mode='r')
+        prices = np.load(price_path, mmap_mode='r')
+        if len(times) != len(prices):
+            # Caught between the two replaces of a writer in another process; don't cache the mix
+            print(f'Price store partition {zone}/{year} is being rewritten, skipping it')
+            return None
+        _partitions[(zone, year)] = (mtime, times, prices)
+        return times, prices
+
+
+def _atomic_save(path: str, arr: np.ndarray):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def write_prices(times, prices, zone: str = 'DK2') -> int:
+    """Merge hourly prices into the store and return the number of new hours.
+
+    `times` may be tz-aware timestamps or int64 UTC epoch seconds. Hours already
+    in the store are kept as they are; only unseen hours are added.
+    """
+    if isinstance(times, np.ndarray) and times.dtype == np.int64:
+        epochs = times
+    else:
+        epochs = pd.DatetimeIndex(pd.to_datetime(times, utc=True)).as_unit('s').asi8
+    values = np.asarray(prices, dtype=np.float32)
+    if len(epochs) == 0:
+        return 0
+    added = 0
+    with _lock:
+        os.makedirs(_zone_dir(zone), exist_ok=True)
+        years = _utc_years(epochs)
+        for year in np.unique(years):
+            sel = years == year
+            new_t, new_p = epochs[sel], values[sel]
+            existing = _read_partition(zone, int(year))
+            if existing is not None:
+                old_t, old_p = np.asarray(existing[0]), np.asarray(existing[1])
+                keep = ~np.isin(new_t, old_t)
+                new_t, new_p = new_t[keep], new_p[keep]
+                if len(new_t) == 0:
+                    continue
+                all_t = np.concatenate([old_t, new_t])
+                all_p = np.concatenate([old_p, new_p])
+            else:
+                all_t, all_p = new_t, new_p
+            all_t, first = np.unique(all_t, return_index=True)
+            all_p = all_p[first]
+            time_path, price_path = _paths(zone, int(year))
+            # Drop cached memmaps before replacing the files underneath them
+            _partitions.pop((zone, int(year)), None)
+            _atomic_save(time_path, all_t.astype(np.int64))
+            _atomic_save(price_path, all_p.astype(np.float32))
+            added += len(new_t)
+    return added
+
+
+def import_csv(path: str = SEED_CSV, zone: str = 'DK2') -> int:
+    """Load a `time_start,DKK_per_kWh` CSV (prices incl. moms) into the store."""
+    df = pd.read_csv(path, usecols=['time_start', 'DKK_per_kWh'])
+    times = pd.to_datetime(df['time_start'], utc=True)
+    return write_prices(times, df['DKK_per_kWh'].to_numpy(), zone=zone)
+
+
+def ensure_seeded(zone: str):
+    if os.path.isdir(_zone_dir(zone)) or not os.path.exists(SEED_CSV):
+        return
+    try:
+        n = import_csv(SEED_CSV, zone=zone)
+        print(f'Seeded price store for {zone} with {n} hours from {SEED_CSV}')
+    except Exception as e:
+        print(f'Could not seed price store from {SEED_CSV}:', e)
+
+
+def stored_years(zone: str = 'DK2') -> list:
+    """UTC years that have a partition on disk for `zone`."""
+    try:
+        names = os.listdir(_zone_dir(zone))
+    except FileNotFoundError:
+        return []
+    return sorted(int(n[:-len('_price.npy')]) for n in names if n.endswith('_price.npy'))
+
+
+def load_prices(start, end, zone: str = 'DK2') -> pd.Series:
+    """Return stored hourly prices with `start <= time_start <= end`.
+
+    The result is a float Series named `DKK_per_kWh` on a tz-aware
+    Europe/Copenhagen index named `time_start`. Naive bounds are read as local time.
+    """
+    ensure_seeded(zone)
+    start_s = _to_epoch_seconds(start)
+    end_s = _to_epoch_seconds(end)
+    first_year, last_year = _utc_years(np.array([start_s, end_s], dtype=np.int64))
+    time_parts, price_parts = [], []
+    for year in range(int(first_year), int(last_year) + 1):
+        part = _read_partition(zone, year)
+        if part is None:
+            continue
+        times, prices = part
+        i0 = np.searchsorted(times, start_s, side='left')
+        i1 = np.searchsorted(times, end_s, side='right')
+        if i1 > i0:
+            time_parts.append(times[i0:i1])
+            price_parts.append(prices[i0:i1])
+    if time_parts:
+        times = np.concatenate(time_parts)
+        prices = np.concatenate(price_parts).astype(np.float64)
+    else:
+        times = np.empty(0, dtype=np.int64)
+        prices = np.empty(0, dtype=np.float64)
+    index = pd.DatetimeIndex(pd.to_datetime(times, unit='s', utc=True), name='time_start').tz_convert(LOCAL_TZ)
+    return pd.Series(prices, index=index, name='DKK_per_kWh')
@@ -0,0 +1,82 @@
+"""Daily, monthly and hour-of-day rollups of the hourly dataset, shared by all tabs.
+
+The rollups are computed once per dataset and cached by a content hash of the
+hourly frame, so widget interactions on a page reuse them instead of every tab
+running its own `groupby` on a copy of the full frame.
+"""
+import hashlib
+
+import pandas as pd
+import streamlit as st
+
+import cost_kernel
+from data_views import column
+
+
+def dataset_key(df: pd.DataFrame) -> str:
+    """Content hash of an hourly dataset, used to key caches derived from it."""
+    hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()
+
+
+def build_rollups(df: pd.DataFrame, totals: dict = None) -> dict:
+    """Aggregate `df` into `daily`, `monthly`, `hour_of_day` frames and `totals`.
+
+    `totals` are the cost kernel's period totals for `df` if the caller has
+    them already; otherwise they are computed here.
+    """
+    price = column(df, 'total_pris_per_kwh')
+    car_kwh = column(df, 'car_kwh')
+    house_kwh = column(df, 'house_kwh') if 'house_kwh' in df.columns else df['usage_kwh'] - car_kwh
+    # Cost of the car's kWh at spot + tarif + afgift, treating missing prices as 0
+    charge_price = column(df, 'spot_pris').fillna(0) + column(df, 'tarif_pris').fillna(0) + column(df, 'afgift_pris').fillna(0)
+    base = pd.DataFrame({
+        'usage_kwh': df['usage_kwh'],
+        'total_udgift': column(df, 'total_udgift'),
+        'spot_pris': column(df, 'spot_pris'),
+        'tarif_pris': column(df, 'tarif_pris'),
+        'total_pris_per_kwh': price,
+        'car_kwh': car_kwh,
+        'house_kwh': house_kwh,
+        'car_cost': car_kwh * price,
+        'house_cost': house_kwh * price,
+        'car_charge_cost': car_kwh * charge_price,
+    })
+    time = df['time']
+
+    sums = ['usage_kwh', 'total_udgift', 'car_kwh', 'house_kwh', 'car_cost', 'house_cost', 'car_charge_cost']
+    means = ['spot_pris', 'total_pris_per_kwh']
+    agg = {**{c: 'sum' for c in sums}, **{c: 'mean' for c in means}}
+
+    daily = base.groupby(time.dt.normalize().rename('date'), sort=True).agg(agg)
+    daily.index = daily.index.date
+
+    month = time.dt.tz_localize(None).dt.to_period('M').rename('month')
+    monthly = base.groupby(month, sort=True).agg(agg)
+
+    hour_of_day = base.groupby(time.dt.hour.rename('hour_of_day'), sort=True).agg({
+        'usage_kwh': 'mean',
+        'spot_pris': 'mean',
+        'tarif_pris': 'first',
+        'total_pris_per_kwh': 'mean',
+        'total_udgift': 'mean',
+    })
+
+    if totals is None:
+        totals = cost_kernel.period_totals(df['usage_kwh'], base['spot_pris'], base['tarif_pris'], column(df, 'afgift_pris'),
+                                           base['total_udgift'], price, car_kwh, house_kwh)
+    totals = pd.Series(totals, dtype=object)
+    totals['first_date'] = daily.index[0] if len(daily) else None
+    totals['last_date'] = daily.index[-1] if len(daily) else None
+
+    return {'daily': daily, 'monthly': monthly, 'hour_of_day': hour_of_day, 'totals': totals}
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_rollups(key, _df, _totals):
+    return build_rollups(_df, _totals)
+
+
+def get_rollups(df: pd.DataFrame, key: str = None, totals: dict = None) -> dict:
+    """Cached `build_rollups(df, totals)`; pass the dataset's `key` to skip re-hashing it."""
+    return _cached_rollups(key or dataset_key(df), df, totals)
@@ -3,25 +3,119 @@ import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime
 
-def render(df, from_date, to_date, _filter_df_by_view_range, udeladning_pris):
-    # Removed date filter, use full range
-    df_tab = df.copy()
+import clever
+import pipeline
+from chart_cache import data_key, get_figure
+from rollups import dataset_key, get_rollups
+
+COLUMNS = ['time', 'usage_kwh', 'spot_pris', 'tarif_pris', 'afgift_pris', 'car_kwh']
+
+
+def _car_charge_figure(display_table):
+    fig_car = go.Figure()
+    fig_car.add_trace(go.Bar(
+        x=display_table['month'],
+        y=display_table['adjusted_total'],
+        name='Estimeret opladningspris (kr.)',
+        marker_color='red',
+        text=display_table['adjusted_total'].round(0),
+        textposition='inside',
+    ))
+    fig_car.add_trace(go.Bar(
+        x=display_table['month'],
+        y=display_table['reimbursed'],
+        name='Clever-refusion (kr.)',
+        marker_color='green',
+        text=display_table['reimbursed'].round(0),
+        textposition='inside',
+    ))
+    fig_car.update_layout(
+        barmode='group',
+        title='Sammenlign, hvad du selv har betalt for hjemmeopladning af bilen, med hvad Clever har refunderet:',
+        xaxis_title='Periode',
+        yaxis_title='kr.',
+        height=450
+    )
+    return fig_car
+
+
+def _with_without_clever_figure(display_table):
+    fig_with_without = go.Figure()
+    fig_with_without.add_trace(go.Bar(
+        x=display_table['month'],
+        y=display_table['total_udgift_uden_clever_abbonemnt'],
+        name='Uden Clever',
+        marker_color='red',
+        text=display_table['total_udgift_uden_clever_abbonemnt'].round(0),
+        textposition='inside',
+    ))
+    fig_with_without.add_trace(go.Bar(
+        x=display_table['month'],
+        y=display_table['total_udgift_ved_clever_abbonemnt'],
+        name='Med Clever',
+        marker_color='green',
+        text=display_table['total_udgift_ved_clever_abbonemnt'].round(0),
+        textposition='inside',
+    ))
+    fig_with_without.update_layout(
+        barmode='group',
+        title='Sammenlign din totale udgift med og uden Clever, inklusive eventuel udeladning',
+        xaxis_title='Måned',
+        yaxis_title='kr.',
+        height=400
+    )
+    return fig_with_without
+
 
-    df_car = df_tab.copy()
-    if 'car_kwh' not in df_car.columns:
-        df_car['car_kwh'] = 0.0
-    afgift_series = df_car['afgift_pris'].fillna(0) if 'afgift_pris' in df_car.columns else 0.0
-    df_car['car_cost'] = df_car['car_kwh'] * (df_car['spot_pris'].fillna(0) + df_car['tarif_pris'].fillna(0) + afgift_series)
-    daily_car = df_car.groupby(df_car['time'].dt.date).agg({'car_cost': 'sum', 'car_kwh': 'sum'}).reset_index()
-    daily_car.columns = ['date', 'total_charge_cost', 'total_charge_kwh']
+def _monthly_overrides(keys, month_labels, auto_kwh):
+    """Clever kWh and udeladning kWh per month, edited in one form.
+
+    Submitted values are kept in `st.session_state['car_charge_overrides']` by
+    integer month key; months without an override use the detected kWh and
+    no udeladning. Typing in the grid does not rerun the page, only submitting.
+    """
+    overrides = st.session_state.setdefault('car_charge_overrides', {})
+    inputs = pd.DataFrame({
+        'Periode': month_labels,
+        'clever_kwh': [overrides.get(k, (kwh, 0.0))[0] for k, kwh in zip(keys.tolist(), auto_kwh)],
+        'udeladning_kwh': [overrides.get(k, (kwh, 0.0))[1] for k, kwh in zip(keys.tolist(), auto_kwh)],
+    })
+    with st.form('car_charge_overrides_form'):
+        edited = st.data_editor(
+            inputs,
+            column_config={
+                'Periode': st.column_config.TextColumn('Periode'),
+                'clever_kwh': st.column_config.NumberColumn('kWh ifølge Clever', min_value=0.0, step=0.01, format='%.2f'),
+                'udeladning_kwh': st.column_config.NumberColumn('Udeladning kWh', min_value=0.0, step=0.01, format='%.2f'),
+            },
+            disabled=['Periode'],
+            hide_index=True,
+            width='stretch',
+            # New key whenever the inputs change, so the grid starts from the stored values
+            key=f'car_charge_overrides_{dataset_key(inputs)[:12]}',
+        )
+        submitted = st.form_submit_button('Opdater beregning')
+    if submitted:
+        values = edited[['clever_kwh', 'udeladning_kwh']].fillna(0.0).astype(float).to_numpy()
+        for k, (clever_kwh, udeladning_kwh) in zip(keys.tolist(), values.tolist()):
+            overrides[k] = (clever_kwh, udeladning_kwh)
+        return values[:, 0], values[:, 1]
+    return inputs['clever_kwh'].to_numpy(dtype=float), inputs['udeladning_kwh'].to_numpy(dtype=float)
+
+
+def render(df, from_date, to_date, _filter_df_by_view_range, udeladning_pris, rollups=None):
+    # Removed date filter, use full range
+    if rollups is None:
+        rollups = get_rollups(df)
+    monthly_rollup = rollups['monthly']
     # Calculate net_price for the period from the monthly table if available
     net_price_total = None
     net_label = 'Clever tilbagebetaling (netto)'
     net_value = 'N/A'
     # Try to get from merged table if it exists (after monthly_table is created)
 
-    total_kwh = daily_car['total_charge_kwh'].sum()
-    total_cost = daily_car['total_charge_cost'].sum()
+    total_kwh = rollups['totals']['car_kwh']
+    total_cost = rollups['totals']['car_charge_cost']
     avg_price = (total_cost / total_kwh) if total_kwh > 0 else 0.0
     st.markdown(f"#### Hjemmeopladning af elbil – samlet oversigt for perioden")
     st.info("Se hvad du betaler for strøm til bilen og hvor meget Clever refunderer. Udfyld gerne dit forbrug fra Clever-appen for mere præcise tal.")
@@ -37,12 +131,9 @@ def render(df, from_date, to_date, _filter_df_by_view_range, udeladning_pris):
     summary += f"Din gennemsnitlige pris for opladning er <b>{avg_price:.2f} kr pr kWh</b>.<br>"
     # Show average monthly estimated charging price (from bar chart: adjusted_total)
     # Recreate merged table logic to get adjusted_total per month
-    monthly_car = df_car.set_index('time').resample('ME').agg({'car_kwh': 'sum', 'car_cost': 'sum'}).reset_index()
-    if not monthly_car.empty:
-        monthly_car['month'] = monthly_car['time'].dt.strftime('%m-%Y')
-        monthly_car['avg_price'] = monthly_car.apply(lambda r: (r['car_cost'] / r['car_kwh']) if r['car_kwh'] > 0 else 0.0, axis=1)
+    if not monthly_rollup.empty:
         # This is the same as the bar chart's 'adjusted_total' if no corrections
-        avg_monthly_cost = monthly_car['car_cost'].mean() if not monthly_car.empty else 0.0
+        avg_monthly_cost = monthly_rollup['car_charge_cost'].mean()
         summary += f"Gennemsnitlig estimeret opladningspris: <b>{avg_monthly_cost:.0f} kr</b> pr måned.<br>"
     if net_label_top:
         summary += f"{net_label_top} (<b>{net_value_top}</b>)<br>"
@@ -50,122 +141,38 @@ def render(df, from_date, to_date, _filter_df_by_view_range, udeladning_pris):
     st.markdown(summary, unsafe_allow_html=True)
     # Divider after summary info box
     st.divider()
-    # --- Monthly aggregation for new bar chart ---
-    monthly_car = df_car.set_index('time').resample('ME').agg({'car_kwh': 'sum', 'car_cost': 'sum'}).reset_index()
-    # (Bar chart logic is handled after merged table is created)
-    # ...existing code...
-    if not monthly_car.empty:
-        monthly_car['month'] = monthly_car['time'].dt.strftime('%m-%y')
-        monthly_car['avg_price'] = monthly_car.apply(lambda r: (r['car_cost'] / r['car_kwh']) if r['car_kwh'] > 0 else 0.0, axis=1)
-        monthly_table = monthly_car[['month', 'car_kwh', 'avg_price', 'car_cost']].copy()
-        monthly_table.columns = ['month', 'kWh opladet (automatisk detekteret)', 'average_price', 'total_price']
-        clever_sats_df = pd.read_csv('clever_tilbagebetaling.csv')
-        clever_sats_df['month'] = clever_sats_df['month'].astype(str)
-        merged = pd.merge(monthly_table, clever_sats_df, on='month', how='left')
-        merged['sats'] = merged['sats'].astype(float).fillna(0.0)
-        merged = merged.rename(columns={'sats': 'clever_rate'})
-        clever_kwh_col = []
-        udeladning_kwh_col = []
+    # --- Monthly reconciliation against Clever (see clever.py) ---
+    if not monthly_rollup.empty:
+        month_labels = monthly_rollup.index.strftime('%m-%y')
+        auto_kwh = monthly_rollup['car_kwh'].to_numpy()
+        keys = clever.month_keys(monthly_rollup.index)
         st.markdown('#### For at få det mest præcise estimat, indtast værdier fra Clever-appen og udeladning for hver måned:')
-        input_cols = st.columns(2)
-        for i, r in merged.iterrows():
-            m = r['month']
-            key_kwh = f'clever_kwh_{m}'
-            key_udelad = f'udeladning_kwh_{m}'
-            default_kwh = float(st.session_state.get(key_kwh, r['kWh opladet (automatisk detekteret)']))
-            default_udelad = float(st.session_state.get(key_udelad, 0.0))
-            with input_cols[0]:
-                clever_kwh_val = st.number_input(f"kWh ifølge Clever ({m})", min_value=0.0, value=default_kwh, step=0.01, key=key_kwh)
-            with input_cols[1]:
-                udeladning_kwh_val = st.number_input(f"Udeladning kWh ({m})", min_value=0.0, value=default_udelad, step=0.01, key=key_udelad)
-            clever_kwh_col.append(clever_kwh_val)
-            udeladning_kwh_col.append(udeladning_kwh_val)
+        clever_kwh_col, udeladning_kwh_col = _monthly_overrides(keys, month_labels, auto_kwh)
         st.divider()
-        merged['clever_kwh'] = clever_kwh_col
-        merged['udeladning_kwh'] = udeladning_kwh_col
-        # Calculate corrections and adjusted total on merged before using in bar chart
-        merged['korrektion_kwh_clever'] = merged['clever_kwh'] - merged['kWh opladet (automatisk detekteret)']
-        merged['korrektion_cost'] = merged['korrektion_kwh_clever'] * merged['average_price']
-        merged['adjusted_total'] = merged['total_price'] + merged['korrektion_cost']
-        merged['reimbursed'] = merged['clever_kwh'] * merged['clever_rate']
+
+        # Memoised per input: a new udeladning price only recomputes the without-Clever columns
+        reconciled = pipeline.reconcile(pipeline.get_pipeline(), keys, auto_kwh, monthly_rollup['car_charge_cost'].to_numpy(),
+                                        clever_kwh_col, udeladning_kwh_col, udeladning_pris)
+        display_table = pd.DataFrame({
+            'month': month_labels,
+            'kWh opladet (automatisk detekteret)': auto_kwh,
+            'total_price': monthly_rollup['car_charge_cost'].to_numpy(),
+            'clever_kwh': clever_kwh_col,
+            'udeladning_kwh': udeladning_kwh_col,
+            **reconciled,
+        })
+
         # --- Bar chart logic (single instance) ---
-        monthly_agg = merged.copy()
-        fig_car = go.Figure()
-        fig_car.add_trace(go.Bar(
-            x=monthly_agg['month'],
-            y=monthly_agg['adjusted_total'],
-            name='Estimeret opladningspris (kr.)',
-            marker_color='red',
-            text=monthly_agg['adjusted_total'].round(0),
-            textposition='inside',
-        ))
-        fig_car.add_trace(go.Bar(
-            x=monthly_agg['month'],
-            y=monthly_agg['reimbursed'],
-            name='Clever-refusion (kr.)',
-            marker_color='green',
-            text=monthly_agg['reimbursed'].round(0),
-            textposition='inside',
-        ))
-        fig_car.update_layout(
-            barmode='group',
-            title='Sammenlign, hvad du selv har betalt for hjemmeopladning af bilen, med hvad Clever har refunderet:',
-            xaxis_title='Periode',
-            yaxis_title='kr.',
-            height=450
-        )
+        plotted = display_table[['month', 'adjusted_total', 'reimbursed']]
+        fig_car = get_figure(data_key(plotted, 'car_charge_bar'), _car_charge_figure, display_table)
         st.markdown('### Månedlig opladningspris vs. Clever-refusion')
         st.plotly_chart(fig_car, width='stretch', key='car_charge_bar_chart')
 
-        # --- Prepare display table (single instance) ---
-        display_table = merged.copy()
-        display_table['korrektion_kwh_clever'] = display_table['clever_kwh'] - display_table['kWh opladet (automatisk detekteret)']
-        display_table['korrektion_cost'] = display_table['korrektion_kwh_clever'] * display_table['average_price']
-        display_table['udeladning_cost'] = display_table['udeladning_kwh'] * udeladning_pris
-        display_table['adjusted_total'] = display_table['total_price'] + display_table['korrektion_cost']
-        display_table['reimbursed'] = display_table['clever_kwh'] * display_table['clever_rate']
-        display_table['net_price'] = display_table['adjusted_total'] - display_table['reimbursed']
-        display_table['clever_abbonnemnt'] = 799.0
-        display_table['total_udgift_ved_clever_abbonemnt'] = display_table['net_price'] + display_table['clever_abbonnemnt']
-        # Afgift er 0,9 kr med moms i 2025 og tidligere, i 2026 er den næsten nul, og du får ingen refusion
-        def get_clever_multiplier(month_str):
-            # month_str is in format 'MM-YY'
-            try:
-                year = int('20' + month_str.split('-')[1])
-                return 0.9 if year < 2026 else 0.0
-            except Exception:
-                return 0.9
-
-        clever_multiplier = display_table['month'].apply(get_clever_multiplier)
-        display_table['total_udgift_uden_clever_abbonemnt'] = display_table['adjusted_total'] + 70 - display_table['clever_kwh'] * clever_multiplier + display_table['udeladning_cost']
-
         # --- New bar chart: Price with and without Clever ---
         st.markdown('### Månedlig udgift: med og uden Clever')
-        fig_with_without = go.Figure()
-        fig_with_without.add_trace(go.Bar(
-            x=display_table['month'],
-            y=display_table['total_udgift_uden_clever_abbonemnt'],
-            name='Uden Clever',
-            marker_color='red',
-            text=display_table['total_udgift_uden_clever_abbonemnt'].round(0),
-            textposition='inside',
-        ))
-        fig_with_without.add_trace(go.Bar(
-            x=display_table['month'],
-            y=display_table['total_udgift_ved_clever_abbonemnt'],
-            name='Med Clever',
-            marker_color='green',
-            text=display_table['total_udgift_ved_clever_abbonemnt'].round(0),
-            textposition='inside',
-        ))
-        fig_with_without.update_layout(
-            barmode='group',
-            title='Sammenlign din totale udgift med og uden Clever, inklusive eventuel udeladning',
-            xaxis_title='Måned',
-            yaxis_title='kr.',
-            height=400
-        )
-        st.plotly_chart(fig_with_without, use_container_width=True, key='with_without_clever_bar_chart')
+        plotted = display_table[['month', 'total_udgift_uden_clever_abbonemnt', 'total_udgift_ved_clever_abbonemnt']]
+        fig_with_without = get_figure(data_key(plotted, 'with_without_clever'), _with_without_clever_figure, display_table)
+        st.plotly_chart(fig_with_without, width='stretch', key='with_without_clever_bar_chart')
 
         display_table = display_table.rename(columns={
             'month': 'Periode',
@@ -200,7 +207,7 @@ def render(df, from_date, to_date, _filter_df_by_view_range, udeladning_pris):
             'Clever fastpris',
         ]
         st.markdown('#### Månedlig udgiftsoversigt (detaljeret tabel)')
-        st.markdown('Du kan nu indtaste værdierne ovenfor. Tabellen herunder opdateres automatisk.')
+        st.markdown("Du kan nu indtaste værdierne ovenfor. Tabellen herunder opdateres, når du trykker 'Opdater beregning'.")
         edited = st.data_editor(
             display_table[display_columns],
             column_config={
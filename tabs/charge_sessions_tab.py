@@ -0,0 +1,48 @@
+import streamlit as st
+
+from charge_sessions import session_table
+
+COLUMNS = ['time', 'spot_pris', 'tarif_pris', 'afgift_pris', 'car_kwh']
+
+
+def render(df, from_date, to_date, _filter_df_by_view_range, sessions=None):
+    if sessions is None:
+        sessions = session_table(df)
+    st.markdown('#### Opladninger – hvad kostede hver opladning?')
+    if sessions.empty:
+        st.info('Ingen opladninger fundet i perioden')
+        return
+
+    last = sessions.iloc[-1]
+    st.info(
+        f"Seneste opladning: **{last['start']:%d-%m-%Y %H:%M}** til **{last['end']:%d-%m-%Y %H:%M}**, "
+        f"**{last['kwh']:.1f} kWh** for **{last['cost']:.0f} kr** "
+        f"(**{last['avg_price']:.2f} kr pr kWh**, heraf spotpris {last['avg_spot']:.2f} kr pr kWh)."
+    )
+
+    view_range = st.date_input('Vis opladninger i perioden', value=(from_date, to_date), key='filter_sessions')
+    # The sessions are sorted by start, so the shared date filter can slice them like the hourly data
+    view = _filter_df_by_view_range(sessions.rename(columns={'start': 'time'}), view_range)
+    table = view.iloc[::-1].rename(columns={
+        'time': 'start',
+        'end': 'slut',
+        'hours': 'timer',
+        'kwh': 'kWh',
+        'cost': 'udgift kr',
+        'avg_spot': 'gns. spotpris',
+        'avg_price': 'gns. pris alt inklusiv',
+    })
+    st.dataframe(
+        table,
+        column_config={
+            'start': st.column_config.DatetimeColumn('start', format='DD-MM-YYYY HH:mm'),
+            'slut': st.column_config.DatetimeColumn('slut', format='DD-MM-YYYY HH:mm'),
+            'kWh': st.column_config.NumberColumn('kWh', format='%.2f'),
+            'udgift kr': st.column_config.NumberColumn('udgift kr', format='%.2f'),
+            'gns. spotpris': st.column_config.NumberColumn('gns. spotpris', format='%.2f'),
+            'gns. pris alt inklusiv': st.column_config.NumberColumn('gns. pris alt inklusiv', format='%.2f'),
+        },
+        hide_index=True,
+        width='stretch',
+    )
+    st.caption(f"{len(view)} opladninger, {view['kwh'].sum():.1f} kWh for {view['cost'].sum():.0f} kr i alt")
@@ -3,109 +3,154 @@ import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
 
-def render(df, from_date, to_date, _filter_df_by_view_range):
+from chart_cache import downsample, figure_key, get_figure
+from rollups import get_rollups
 
-    df_tab = df.copy()
+COLUMNS = ['time', 'usage_kwh', 'spot_pris', 'total_pris_per_kwh', 'car_kwh', 'house_kwh']
+
+
+def _monthly_cost_figure(monthly):
+    fig1 = go.Figure()
+    fig1.add_trace(go.Bar(
+        x=monthly['month_str'],
+        y=monthly['car_cost'],
+        name='Bil opladning (kr.)',
+        marker_color='green',
+        text=monthly['car_cost'].round(0),
+        textposition='inside'
+    ))
+    fig1.add_trace(go.Bar(
+        x=monthly['month_str'],
+        y=monthly['house_cost'],
+        name='Resten af forbruget (kr.)',
+        marker_color='red',
+        text=monthly['house_cost'].round(0),
+        textposition='inside'
+    ))
+    fig1.update_layout(
+        barmode='group',
+        title='Månedlig totaludgift: bil vs. resten',
+        xaxis_title='Måned',
+        yaxis_title='Total pris (kr.)',
+        height=400
+    )
+    return fig1
+
+
+def _monthly_usage_figure(monthly_avg):
+    fig_usage = go.Figure()
+    fig_usage.add_trace(go.Bar(
+        x=monthly_avg['month_str'],
+        y=monthly_avg['usage_kwh'],
+        name='Forbrug (kWh)',
+        marker_color='dodgerblue',
+        text=monthly_avg['usage_kwh'].round(0),
+        textposition='inside',
+        textfont=dict(color='white')
+    ))
+    fig_usage.update_layout(
+        title='Månedligt elforbrug (kWh)',
+        xaxis_title='Måned',
+        yaxis_title='Forbrug (kWh)',
+        height=400
+    )
+    return fig_usage
+
+
+def _monthly_price_figure(monthly_avg):
+    fig_price = go.Figure()
+    fig_price.add_trace(go.Scatter(
+        x=monthly_avg['month_str'],
+        y=monthly_avg['spot_pris'],
+        mode='lines+markers+text',
+        name='Gns. spotpris (kr./kWh)',
+        line=dict(color='green'),
+        text=monthly_avg['spot_pris'].round(2),
+        textposition='top center',
+        textfont=dict(color='green')
+    ))
+    fig_price.add_trace(go.Scatter(
+        x=monthly_avg['month_str'],
+        y=monthly_avg['total_pris_per_kwh'],
+        mode='lines+markers+text',
+        name='Gns. totalpris (kr./kWh)',
+        line=dict(color='black'),
+        text=monthly_avg['total_pris_per_kwh'].round(2),
+        textposition='top center',
+        textfont=dict(color='black')
+    ))
+    fig_price.update_layout(
+        title='Månedlig gennemsnitlig spotpris og totalpris',
+        xaxis_title='Måned',
+        yaxis_title='Pris (kr./kWh)',
+        height=400
+    )
+    return fig_price
+
+
+def _hourly_figure(df_view):
+    # Spikes in usage (car charging) must survive downsampling, prices follow the shape
+    usage_x, usage_y = downsample(df_view['time'], df_view['usage_kwh'], method='min_max')
+    spot_x, spot_y = downsample(df_view['time'], df_view['spot_pris'])
+    fig_hourly = go.Figure()
+    fig_hourly.add_trace(go.Scatter(
+        x=usage_x,
+        y=usage_y,
+        mode='lines',
+        name='Forbrug (kWh)',
+        line=dict(color='dodgerblue', width=1)
+    ))
+    fig_hourly.add_trace(go.Scatter(
+        x=spot_x,
+        y=spot_y,
+        mode='lines',
+        name='Spotpris (kr./kWh)',
+        line=dict(color='green', width=1),
+        yaxis='y2'
+    ))
+    fig_hourly.update_layout(
+        title='Forbrug og spotpris time for time',
+        xaxis_title='Tid',
+        yaxis=dict(title='Forbrug (kWh)'),
+        yaxis2=dict(title='Spotpris (kr./kWh)', overlaying='y', side='right'),
+        height=400
+    )
+    return fig_hourly
+
+
+def render(df, from_date, to_date, _filter_df_by_view_range, rollups=None):
+
+    if rollups is None:
+        rollups = get_rollups(df)
+    # Månedlig aggregering (sorteret efter måned)
+    monthly = rollups['monthly'].reset_index()
+    monthly['month_str'] = monthly['month'].dt.strftime('%b %Y')
 
-    # Månedlig aggregering
-    df_tab['month'] = df_tab['time'].dt.to_period('M')
-    # Sorter efter måned
-    df_tab = df_tab.sort_values('month')
-    print(df_tab.columns)
     # Total pris for bil og resten (udregnet fra kWh og pris)
-    if 'car_kwh' in df_tab.columns and 'house_kwh' in df_tab.columns:
-        df_tab['car_cost'] = df_tab['car_kwh'] * df_tab['total_pris_per_kwh']
-        df_tab['house_cost'] = df_tab['house_kwh'] * df_tab['total_pris_per_kwh']
-        monthly = df_tab.groupby('month').agg({
-            'car_cost': 'sum',
-            'house_cost': 'sum'
-        }).reset_index()
-        monthly['month_str'] = monthly['month'].dt.strftime('%b %Y')
-        fig1 = go.Figure()
-        fig1.add_trace(go.Bar(
-            x=monthly['month_str'],
-            y=monthly['car_cost'],
-            name='Bil opladning (kr.)',
-            marker_color='green',
-            text=monthly['car_cost'].round(0),
-            textposition='inside'
-        ))
-        fig1.add_trace(go.Bar(
-            x=monthly['month_str'],
-            y=monthly['house_cost'],
-            name='Resten af forbruget (kr.)',
-            marker_color='red',
-            text=monthly['house_cost'].round(0),
-            textposition='inside'
-        ))
-        fig1.update_layout(
-            barmode='group',
-            title='Månedlig totaludgift: bil vs. resten',
-            xaxis_title='Måned',
-            yaxis_title='Total pris (kr.)',
-            height=400
-        )
-        st.plotly_chart(fig1, use_container_width=True)
+    if 'car_kwh' in df.columns and 'house_kwh' in df.columns:
+        fig1 = get_figure(figure_key(df, 'monthly_cost'), _monthly_cost_figure, monthly)
+        st.plotly_chart(fig1, width='stretch')
 
     # Månedlig gennemsnitlig spotpris og totalpris (Figur 1)
-    if 'spot_pris' in df_tab.columns and 'total_pris_per_kwh' in df_tab.columns:
-        agg_dict = {
-            'spot_pris': 'mean',
-            'total_pris_per_kwh': 'mean'
-        }
-        if 'usage_kwh' in df_tab.columns:
-            agg_dict['usage_kwh'] = 'sum'
-        monthly_avg = df_tab.groupby('month').agg(agg_dict).reset_index()
-        monthly_avg['month_str'] = monthly_avg['month'].dt.strftime('%b %Y')
+    if 'spot_pris' in df.columns and 'total_pris_per_kwh' in df.columns:
+        monthly_avg = monthly
 
         # Figure for usage (first)
-        if 'usage_kwh' in monthly_avg.columns:
-            fig_usage = go.Figure()
-            fig_usage.add_trace(go.Bar(
-                x=monthly_avg['month_str'],
-                y=monthly_avg['usage_kwh'],
-                name='Forbrug (kWh)',
-                marker_color='dodgerblue',
-                text=monthly_avg['usage_kwh'].round(0),
-                textposition='inside',
-                textfont=dict(color='white')
-            ))
-            fig_usage.update_layout(
-                title='Månedligt elforbrug (kWh)',
-                xaxis_title='Måned',
-                yaxis_title='Forbrug (kWh)',
-                height=400
-            )
-            st.plotly_chart(fig_usage, use_container_width=True)
+        if 'usage_kwh' in df.columns:
+            fig_usage = get_figure(figure_key(df, 'monthly_usage'), _monthly_usage_figure, monthly_avg)
+            st.plotly_chart(fig_usage, width='stretch')
 
         # Figure for prices (second)
-        fig_price = go.Figure()
-        fig_price.add_trace(go.Scatter(
-            x=monthly_avg['month_str'],
-            y=monthly_avg['spot_pris'],
-            mode='lines+markers+text',
-            name='Gns. spotpris (kr./kWh)',
-            line=dict(color='green'),
-            text=monthly_avg['spot_pris'].round(2),
-            textposition='top center',
-            textfont=dict(color='green')
-        ))
-        fig_price.add_trace(go.Scatter(
-            x=monthly_avg['month_str'],
-            y=monthly_avg['total_pris_per_kwh'],
-            mode='lines+markers+text',
-            name='Gns. totalpris (kr./kWh)',
-            line=dict(color='black'),
-            text=monthly_avg['total_pris_per_kwh'].round(2),
-            textposition='top center',
-            textfont=dict(color='black')
-        ))
-        fig_price.update_layout(
-            title='Månedlig gennemsnitlig spotpris og totalpris',
-            xaxis_title='Måned',
-            yaxis_title='Pris (kr./kWh)',
-            height=400
-        )
-        st.plotly_chart(fig_price, use_container_width=True)
+        fig_price = get_figure(figure_key(df, 'monthly_price'), _monthly_price_figure, monthly_avg)
+        st.plotly_chart(fig_price, width='stretch')
     else:
         st.warning('Data mangler for spotpris og/eller totalpris. Grafen kan ikke vises.')
+
+    # Timeværdier for den valgte periode
+    if 'usage_kwh' in df.columns and 'spot_pris' in df.columns:
+        view_range = st.date_input('Vis periode (timegraf)', value=(from_date, to_date), key='filter_charts')
+        df_view = _filter_df_by_view_range(df, view_range)
+        if not df_view.empty:
+            span = (str(df_view['time'].iloc[0]), str(df_view['time'].iloc[-1]))
+            fig_hourly = get_figure(figure_key(df, 'hourly', span), _hourly_figure, df_view)
+            st.plotly_chart(fig_hourly, width='stretch')
@@ -1,12 +1,13 @@
 import streamlit as st
 
-def render(df, from_date, to_date, _filter_df_by_view_range):
-    df_tab = df.copy()
-    daily_summary = df_tab.groupby(df_tab['time'].dt.date).agg({
-        'usage_kwh': 'sum',
-        'total_udgift': 'sum',
-        'spot_pris': 'mean'
-    }).reset_index()
+from rollups import get_rollups
+
+COLUMNS = ['time', 'usage_kwh', 'total_udgift', 'spot_pris']
+
+def render(df, from_date, to_date, _filter_df_by_view_range, rollups=None):
+    if rollups is None:
+        rollups = get_rollups(df)
+    daily_summary = rollups['daily'][['usage_kwh', 'total_udgift', 'spot_pris']].rename_axis('dato').reset_index()
     daily_summary['gennemsnits strømpris alt inklusiv'] = daily_summary['total_udgift'] / daily_summary['usage_kwh']
     daily_summary.columns = [
         'dato',
@@ -1,5 +1,13 @@
 import streamlit as st
 
+import exports
+from data_views import page_view, select_rows
+from rollups import dataset_key
+
+PAGE_SIZES = [50, 100, 250, 500]
+
+COLUMNS = ['time', 'usage_kwh', 'spot_pris', 'tarif_pris', 'afgift_pris', 'total_pris_per_kwh', 'total_udgift', 'car_charging', 'car_kwh', 'house_kwh']
+
 def render(df, from_date, to_date, _filter_df_by_view_range):
     view_range = st.date_input('Vis periode (filter)', value=(from_date, to_date), key='filter_tab3')
     st.markdown('Alle priser er med moms. Du kan filtrere perioden ved at bruge periodefilteret, og dykke ned i de enkelte timers forbrug.')
@@ -29,12 +37,57 @@ def render(df, from_date, to_date, _filter_df_by_view_range):
     ]
     # Only keep columns that exist in df_tab
     ordered_cols = [col for col in ordered_cols if col in df_tab.columns]
-    df_tab_renamed = df_tab[ordered_cols].rename(columns=col_map)
-    st.dataframe(df_tab_renamed, width='stretch', height=600)
-    csv = df_tab_renamed.to_csv(index=False)
+    # The export keeps the hour of each row as its first column
+    export_cols = ['time'] + ordered_cols if 'time' in df_tab.columns else ordered_cols
+    df_tab_renamed = df_tab[export_cols].rename(columns={**col_map, 'time': 'tidspunkt'})
+
+    # Paging, sorting and filtering run here; only the visible page is sent to the browser
+    with st.expander('Sortering og filtre'):
+        c1, c2, c3 = st.columns(3)
+        sort_by = c1.selectbox('Sorter efter', ['time'] + [c for c in ordered_cols if c != 'car_charging'],
+                               format_func=lambda c: col_map.get(c, 'tidspunkt'), key='sort_tab3')
+        ascending = c2.radio('Rækkefølge', ['Stigende', 'Faldende'], horizontal=True, key='order_tab3') == 'Stigende'
+        page_size = c3.selectbox('Rækker per side', PAGE_SIZES, index=1, key='page_size_tab3')
+
+        filters = {}
+        filter_cols = st.multiselect('Filtrer på kolonner', [c for c in ordered_cols if c != 'car_charging'],
+                                     format_func=col_map.get, key='filter_cols_tab3')
+        for col in filter_cols:
+            values = df_tab[col]
+            lo, hi = float(values.min()), float(values.max())
+            if lo < hi:
+                filters[col] = st.slider(col_map[col], lo, hi, (lo, hi))
+        if 'car_charging' in ordered_cols:
+            charging = st.radio('Bil oplader', ['Alle', 'Ja', 'Nej'], horizontal=True, key='filter_charging_tab3')
+            if charging != 'Alle':
+                filters['car_charging'] = charging == 'Ja'
+
+    positions = select_rows(df_tab, filters, sort_by, ascending)
+    n_pages = max(1, -(-len(positions) // page_size))
+    page = st.number_input(f'Side (af {n_pages})', min_value=1, max_value=n_pages, value=1, step=1)
+    page_df = page_view(df_tab, positions, page, page_size)
+    page_df = page_df.set_index('time')[ordered_cols].rename(columns=col_map).rename_axis('tidspunkt')
+    first = (page - 1) * page_size + 1 if len(positions) else 0
+    st.caption(f'Viser række {first}–{min(page * page_size, len(positions))} af {len(positions)}')
+    st.dataframe(page_df, width='stretch', height=600)
+
+    fmt = st.selectbox('Filformat', list(exports.FORMATS), format_func=lambda f: exports.FORMATS[f][0], key='export_format_tab3')
+    label, ext, mime = exports.FORMATS[fmt]
+
+    df_key = st.session_state.get('df_key')
+
+    def _export():
+        # Runs only when the button is clicked, on a separate thread
+        dataset = df_key or dataset_key(df)
+        times = df_tab['time'] if 'time' in df_tab.columns else None
+        period = (str(times.iloc[0]), str(times.iloc[-1])) if times is not None and len(times) else None
+        key = (dataset, tuple(df_tab_renamed.columns), period, len(df_tab_renamed))
+        return exports.export_file(df_tab_renamed, fmt, key)
+
     st.download_button(
-        label='📥 Download as CSV',
-        data=csv,
-        file_name=f'power_usage_{from_date}_to_{to_date}.csv',
-        mime='text/csv'
+        label=f'📥 Download as {label}',
+        data=_export,
+        file_name=f'power_usage_{from_date}_to_{to_date}.{ext}',
+        mime=mime,
+        on_click='ignore',
     )
@@ -1,17 +1,14 @@
 import streamlit as st
 import plotly.graph_objects as go
 
-def render(df, from_date, to_date, _filter_df_by_view_range):
-    df_tab = df.copy()
-    hourly_stats = df_tab.copy()
-    hourly_stats['hour_of_day'] = hourly_stats['time'].dt.hour
-    avg_by_hour = hourly_stats.groupby('hour_of_day').agg({
-        'usage_kwh': 'mean',
-        'spot_pris': 'mean',
-        'tarif_pris': 'first',
-        'total_pris_per_kwh': 'mean',
-        'total_udgift': 'mean'
-    }).reset_index()
+from rollups import get_rollups
+
+COLUMNS = ['time', 'usage_kwh', 'spot_pris', 'tarif_pris', 'total_pris_per_kwh', 'total_udgift']
+
+def render(df, from_date, to_date, _filter_df_by_view_range, rollups=None):
+    if rollups is None:
+        rollups = get_rollups(df)
+    avg_by_hour = rollups['hour_of_day'].reset_index()
     avg_by_hour['gennemsnits strømpris alt inklusiv'] = avg_by_hour['total_udgift'] / avg_by_hour['usage_kwh']
     avg_by_hour = avg_by_hour.rename(columns={
         'hour_of_day': 'time',
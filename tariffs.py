@@ -0,0 +1,127 @@
+"""Tariff calendar built once from `tariffs_manual.csv` and priced by array lookup.
+
+The CSV rules (month_start,month_end,hour_start,hour_end,price) are folded into
+a `(version, month, hour-of-day)` table. An optional `valid_from` column
+(YYYY-MM-DD, local date) starts a new version of the table; rows without it
+apply from the beginning of time. Within a version later rows win, like the
+old row-by-row masking did.
+"""
+import numpy as np
+import pandas as pd
+
+from file_cache import FileCache
+from hour_keys import LOCAL_TZ
+
+TARIFF_CSV = 'tariffs_manual.csv'
+
+
+class TariffTable:
+    """Hourly tariffs as a `(n_versions, 12, 24)` array plus version start times."""
+
+    def __init__(self, valid_from: np.ndarray, table: np.ndarray):
+        # valid_from: sorted int64 UTC epoch nanoseconds, one per version
+        self.valid_from = valid_from
+        self.table = table
+
+    @classmethod
+    def from_rules(cls, rules: pd.DataFrame) -> 'TariffTable':
+        if 'valid_from' in rules.columns:
+            starts = pd.to_datetime(rules['valid_from'])
+        else:
+            starts = pd.Series(pd.NaT, index=rules.index, dtype='datetime64[ns]')
+        keys = [int(pd.Timestamp(s).tz_localize(LOCAL_TZ).as_unit('ns').value) if not pd.isna(s) else np.iinfo(np.int64).min
+                for s in starts]
+        versions = sorted(set(keys))
+        table = np.zeros((len(versions), 12, 24), dtype=np.float64)
+        for key, row in zip(keys, rules.itertuples(index=False)):
+            ms, me = int(row.month_start), int(row.month_end)
+            hs, he = int(row.hour_start), int(row.hour_end)
+            if ms <= me:
+                months = np.arange(ms - 1, me)
+            else:
+                months = np.concatenate([np.arange(ms - 1, 12), np.arange(0, me)])
+            table[versions.index(key), months, hs:he] = float(row.price)
+        return cls(np.array(versions, dtype=np.int64), table)
+
+    def rates(self, index: pd.DatetimeIndex) -> np.ndarray:
+        """Tariff in DKK/kWh for each timestamp; hours before the first version get 0."""
+        index = pd.DatetimeIndex(index)
+        if index.tz is None:
+            index = index.tz_localize(LOCAL_TZ, ambiguous='infer', nonexistent='shift_forward')
+        local = index.tz_convert(LOCAL_TZ)
+        version = np.searchsorted(self.valid_from, local.as_unit('ns').asi8, side='right') - 1
+        out = self.table[np.maximum(version, 0), local.month.to_numpy() - 1, local.hour.to_numpy()]
+        out[version < 0] = 0.0
+        return out
+
+
+_tables = FileCache(lambda path: TariffTable.from_rules(pd.read_csv(path)))
+
+
+def load_tariff_table(path: str = TARIFF_CSV) -> TariffTable:
+    """Return the tariff table for `path`, rebuilt only when the file changes."""
+    return _tables.get(path)
+
+
+def tariff_table_version(path: str = TARIFF_CSV):
+    """Version of the tariff CSV (see `FileCache.version`), for keying results built from it."""
+    return _tables.version(path)
+
+
+def _parse_iso_dt(s):
+    if not s:
+        return None
+    try:
+        ts = pd.Timestamp(s)
+    except Exception:
+        return None
+    # Naive timestamps from the charges API are UTC
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+def _hour_slots(prices) -> np.ndarray:
+    """Fold HOUR-type `prices` (position 1..24) into a 24-slot hour-of-day array."""
+    slots = np.zeros(24, dtype=np.float64)
+    for p in prices:
+        try:
+            slots[(int(p.get('position')) - 1) % 24] += float(p.get('price') or 0)
+        except (TypeError, ValueError):
+            continue
+    return slots
+
+
+def build_hourly_tariffs(charges_result, start_dt, end_dt, tzname: str = LOCAL_TZ) -> pd.Series:
+    """Sum the tariffs of an Eloverblik `getcharges` result onto an hourly index.
+
+    Each tariff is applied to the slice of hours inside its validity interval
+    (found with `searchsorted`); HOUR-type tariffs gather from a 24-slot
+    position array, other period types add their first price to every hour.
+    Returns a Series in DKK/kWh on a tz-aware `tzname` index from `start_dt`
+    to `end_dt` (inclusive, floored to the hour).
+    """
+    start = pd.Timestamp(start_dt)
+    end = pd.Timestamp(end_dt)
+    start = (start.tz_localize(tzname) if start.tzinfo is None else start).tz_convert('UTC').floor('h')
+    end = (end.tz_localize(tzname) if end.tzinfo is None else end).tz_convert('UTC').floor('h')
+    idx = pd.date_range(start, end, freq='h').tz_convert(tzname)
+    keys = idx.as_unit('ns').asi8
+    hour_of_day = idx.hour.to_numpy()
+    values = np.zeros(len(idx), dtype=np.float64)
+
+    for item in charges_result:
+        result = item.get('result') or {}
+        for tariff in result.get('tariffs') or []:
+            vfrom = _parse_iso_dt(tariff.get('validFromDate'))
+            vto = _parse_iso_dt(tariff.get('validToDate'))
+            i0 = 0 if vfrom is None else np.searchsorted(keys, vfrom.floor('h').as_unit('ns').value, side='left')
+            i1 = len(keys) if vto is None else np.searchsorted(keys, vto.floor('h').as_unit('ns').value, side='right')
+            if i1 <= i0:
+                continue
+            prices = tariff.get('prices') or []
+            if (tariff.get('periodType') or '').upper() == 'HOUR':
+                values[i0:i1] += _hour_slots(prices)[hour_of_day[i0:i1]]
+            elif prices:
+                # DAY or other: apply first price to all hours
+                values[i0:i1] += float(prices[0].get('price') or 0)
+
+    return pd.Series(values, index=idx, name='tariff_dkk_per_kwh')
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Test script: check `hour_keys.as_date` on the inputs the date filters pass it."""
+from datetime import date, datetime
+import sys
+
+import pandas as pd
+
+from hour_keys import as_date
+
+CASES = [
+    (None, None),
+    (date(2025, 3, 30), date(2025, 3, 30)),
+    (datetime(2025, 3, 30, 23, 15), date(2025, 3, 30)),
+    (pd.Timestamp('2025-03-30 23:15'), date(2025, 3, 30)),
+    (pd.Timestamp('2025-10-25 23:30', tz='UTC').tz_convert('Europe/Copenhagen'), date(2025, 10, 26)),
+    ('2025-10-26', date(2025, 10, 26)),
+]
+
+
+def test_as_date():
+    for value, expected in CASES:
+        result = as_date(value)
+        assert result == expected and type(result) is type(expected), f'as_date({value!r}) gave {result!r}'
+
+
+if __name__ == '__main__':
+    try:
+        test_as_date()
+    except AssertionError as e:
+        print('FAILED:', e)
+        sys.exit(1)
+    print('as_date OK')